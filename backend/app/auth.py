@@ -0,0 +1,51 @@
+"""
+API key authentication for MediCare AI
+Used where data belongs to a caller (analysis history)
+
+Keys are configured in Settings (API_KEYS). The upstream scheduler uses the
+same "key-<hash>" ids as tenants, so TENANT_WEIGHTS can refer to them.
+X-Tenant-ID is never used here - it is just a label anyone can send.
+"""
+
+# Import libraries
+import hashlib
+import hmac
+from fastapi import HTTPException
+from app.config import settings
+
+
+def api_principal(api_key: str | None):
+    """
+    Stable owner id for a configured API key
+
+    Returns:
+        "key-<hash>" for a valid key, None for a missing or unknown one
+    """
+    if not api_key:
+        return None
+    # Compare every key in constant time so timing doesn't leak a match
+    valid = False
+    for key in settings.api_key_list:
+        valid |= hmac.compare_digest(api_key.encode(), key.encode())
+    if not valid:
+        return None
+    return "key-" + hashlib.sha256(api_key.encode()).hexdigest()[:24]
+
+
+def require_principal(api_key: str | None):
+    """
+    Owner id of the caller, or an HTTP error
+
+    Raises:
+        HTTPException: 401 without an API key, 403 with an unknown one
+    """
+    if not api_key:
+        raise HTTPException(
+            status_code=401,
+            detail="An API key (X-API-Key) is required",
+            headers={"WWW-Authenticate": "ApiKey"}
+        )
+    principal = api_principal(api_key)
+    if principal is None:
+        raise HTTPException(status_code=403, detail="Invalid API key")
+    return principal
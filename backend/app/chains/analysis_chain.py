@@ -6,13 +6,16 @@ Uses structured output with Pydantic models
 # Import Libraries
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.output_parsers import PydanticOutputParser
+from functools import lru_cache
 from app.config import load_google_llm
 from app.models.schemas import MedicalAnalysis
+from app.services.deadline import run_stage, DeadlineExceeded
+from app.services.scheduler import Overloaded
 
-def create_analysis_chain(language: str = "en"):
-    
-    # Load the LLM
-    llm = load_google_llm()
+# Cached per language so the prompt and parser are only built once
+# (the format instructions come from the JSON schema, which is slow to build)
+@lru_cache()
+def create_analysis_prompt(language: str = "en"):
     
     # Create Pydantic Parser - forces structured output
     parser = PydanticOutputParser(pydantic_object=MedicalAnalysis)
@@ -65,24 +68,40 @@ Respond ONLY with valid JSON."""
     # Partially fill in format instructions
     prompt = prompt.partial(format_instructions=format_instructions)
     
+    return prompt, parser
+
+
+# One chain per language - forked workers rebuild it around their own LLM client
+@lru_cache()
+def create_analysis_chain(language: str = "en"):
+    
+    # Load the LLM
+    llm = load_google_llm()
+    
+    # Reuse the prompt and parser built for this language
+    prompt, parser = create_analysis_prompt(language)
+    
     # Chain: prompt -> LLM -> Parser
     chain = prompt | llm | parser
     
     return chain
 
 
-def analyze_medical_record(text: str, context: str = "", language: str = "en"):
+async def analyze_medical_record(text: str, context: str = "", language: str = "en", budget_share: float = 1.0):
     
     # Create the Chain
     chain = create_analysis_chain(language)
     
-    # Invoke the chain
+    # Invoke the chain within the request's time budget
     try:
-        result = chain.invoke({
+        result = await run_stage("gemini.analysis", lambda: chain.ainvoke({
             "medical_text": text,
             "context": context if context else "No additional conetxt provided"
-        })
+        }), share=budget_share, hedge=True)
         return result
+    except (DeadlineExceeded, Overloaded):
+        # Out of time or shed - let the route report it instead of a fallback
+        raise
     except Exception as e:
         # Fallback if parsing fails
         print(f"Analysis Error: {e}")
@@ -4,15 +4,16 @@ Simple, beginner-friendly implementation
 """
 
 # Import Libraries and functions
-from langchain_core.prompts import ChatPromptTemplate
+from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
 from langchain_core.output_parsers import StrOutputParser
+from functools import lru_cache
 from app.config import load_google_llm
+from app.services.chat_memory import chat_memory
+from app.services.deadline import run_stage
 
-def create_chat_chain(language: str = "en"):
-    
-    
-    # Load the LLM
-    llm = load_google_llm()
+# One prompt per language, built once - it stays valid in forked workers
+@lru_cache()
+def create_chat_prompt(language: str = "en"):
     
     # Create prompt template based on language
     if language == "fr":
@@ -24,7 +25,7 @@ Vos responsabilités:
 - Toujours recommander de consulter un professionnel de santé qualifié
 - Être culturellement sensible au contexte camerounais
 
-IMPORTANT: Vous n'êtes PAS un médecin. Ne donnez jamais de diagnostic définitif."""
+IMPORTANT: Vous n'êtes PAS un médecin. Ne donnez jamais de diagnostic définitif.{history_summary}"""
     else:
         system_message = """You are MediCare AI, a medical AI assistant for Cameroon.
 
@@ -34,14 +35,33 @@ Your responsibilities:
 - Always recommend consulting qualified healthcare professionals
 - Be culturally sensitive to the Cameroonian context
 
-IMPORTANT: You are NOT a doctor. Never provide definitive diagnoses."""
+IMPORTANT: You are NOT a doctor. Never provide definitive diagnoses.{history_summary}"""
 
     # Create the chat prompt
+    # Earlier turns of a session go in the history placeholder
     prompt = ChatPromptTemplate.from_messages([
         ("system", system_message),
+        MessagesPlaceholder("history", optional=True),
         ("user", "{user_question}")
     ])
 
+    # No summary unless the caller has a session
+    prompt = prompt.partial(history_summary="")
+    
+    return prompt
+
+
+# One chain per language, built once (it holds no per-request state)
+# Only the LLM client changes when a worker rebuilds it after fork
+@lru_cache()
+def create_chat_chain(language: str = "en"):
+    
+    # Load the LLM
+    llm = load_google_llm()
+    
+    # Reuse the prompt built for this language
+    prompt = create_chat_prompt(language)
+
     # Create the output parser
     parser = StrOutputParser()
     
@@ -52,14 +72,31 @@ IMPORTANT: You are NOT a doctor. Never provide definitive diagnoses."""
     return chain
 
 
-def get_chat_response(message: str, language: str = "en"):
+async def get_chat_response(message: str, language: str = "en", session_id: str | None = None, budget_share: float = 1.0):
     
     # Create the chain
     chain = create_chat_chain(language)
     
-    # Invoke the chain the user message
-    response = chain.invoke({
-        "user_question": message
-    })
+    inputs = {"user_question": message}
+    
+    # Load bounded history for this session
+    if session_id:
+        summary, history = await chat_memory.aload(session_id)
+        inputs["history"] = history
+        if summary:
+            label = "Résumé de la conversation précédente" if language == "fr" else "Summary of the earlier conversation"
+            inputs["history_summary"] = f"\n\n{label}:\n{summary}"
+    
+    # Invoke the chain the user message within the request's time budget
+    response = await run_stage(
+        "gemini.chat",
+        lambda: chain.ainvoke(inputs),
+        share=budget_share,
+        hedge=True
+    )
+    
+    # Remember this turn for the next request
+    if session_id:
+        await chat_memory.arecord_turn(session_id, message, response)
     
     return response
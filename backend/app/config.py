@@ -4,13 +4,37 @@ Loads environment variables and LangChain Models
 """
 
 # Import libraries
+import math
 import os
+from typing import Literal
 from pydantic_settings import BaseSettings
-from pydantic import Field
+from pydantic import Field, field_validator
 from langchain_google_genai import ChatGoogleGenerativeAI
 from functools import lru_cache
 
 
+def parse_tenant_weights(text: str):
+    """
+    Convert "clinic-a=3,clinic-b=1" to {"clinic-a": 3.0, "clinic-b": 1.0}
+
+    Raises:
+        ValueError: A pair is malformed or its weight is not a positive number
+    """
+    weights = {}
+    for pair in text.split(","):
+        if not pair.strip():
+            continue
+        tenant, separator, weight = pair.partition("=")
+        try:
+            value = float(weight)
+        except ValueError:
+            value = math.nan
+        if not separator or not tenant.strip() or not (math.isfinite(value) and value > 0):
+            raise ValueError(f"Invalid tenant weight {pair.strip()!r} - expected tenant=<positive number>")
+        weights[tenant.strip()] = value
+    return weights
+
+
 class Settings(BaseSettings):
     """Application settings loaded from environment variables"""
     
@@ -22,15 +46,67 @@ class Settings(BaseSettings):
     host: str = Field(default="0.0.0.0")
     port: int = Field(default=8000)
     cors_origins: str = Field(default="http://localhost:3000")
-    
+    api_keys: str = Field(default="", description="Comma-separated API keys allowed to store and read history")
+
+    # Production Server Settings (python -m app.serve)
+    workers: int = Field(default=1, ge=1, description="Number of worker processes")
+    event_loop: Literal["auto", "uvloop", "asyncio"] = Field(default="auto", description="auto, uvloop or asyncio")
+    http_parser: Literal["auto", "httptools", "h11"] = Field(default="auto", description="auto, httptools or h11")
+    preload_app: bool = Field(default=True, description="Load settings and chains before forking workers")
+    graceful_timeout: int = Field(default=30, ge=1, description="Seconds to drain requests on shutdown")
+    max_requests: int = Field(default=0, ge=0, description="Recycle a worker after this many requests (0 = never)")
+    max_requests_jitter: int = Field(default=0, ge=0, description="Random extra requests so workers don't recycle together")
+    backlog: int = Field(default=2048, ge=1)
+    keepalive_timeout: int = Field(default=5, ge=1)
+
     # AI Model Settings
     gemini_model: str = Field(default="gemini-2.0-flash-exp")
     temperature: float = Field(default=0.7, ge=0.0, le=2.0)
     max_tokens: int = Field(default=2048, ge=100, le=8192)
     
+    # Deadline & Hedging Settings
+    request_timeout: float = Field(default=30.0, gt=0, description="Default seconds a request may take")
+    max_request_timeout: float = Field(default=120.0, gt=0, description="Upper bound for X-Request-Timeout")
+    hedge_enabled: bool = Field(default=False, description="Duplicate slow idempotent upstream calls")
+    hedge_percentile: float = Field(default=95.0, gt=0, lt=100, description="Hedge calls slower than this percentile")
+    hedge_min_samples: int = Field(default=20, ge=1, description="Samples needed before hedging a stage")
+    hedge_max_ratio: float = Field(default=0.1, ge=0.0, le=1.0, description="Max extra upstream load from hedges")
+
+    # Upstream Scheduler Settings
+    upstream_concurrency: int = Field(default=16, ge=1, description="Concurrent Gemini/Tavily calls per worker")
+    scheduler_max_queue: int = Field(default=500, ge=1, description="Calls allowed to wait for a slot")
+    tenant_weights: str = Field(
+        default="",
+        description="Comma-separated tenant=weight pairs (key-<hash> ids from /api/scheduler/stats when API_KEYS is set)"
+    )
+    default_tenant_weight: float = Field(default=1.0, gt=0)
+    scheduler_max_tenants: int = Field(default=1000, ge=1, description="Tenants tracked per worker, extra ones share 'anonymous'")
+
+    # Response Settings
+    compression_min_size: int = Field(default=1024, ge=0, description="Compress bodies at least this many bytes")
+    gzip_level: int = Field(default=6, ge=1, le=9)
+    brotli_quality: int = Field(default=5, ge=0, le=11)
+    research_cache_ttl: int = Field(default=600, ge=0, description="Seconds research results stay cached (0 = off)")
+    research_cache_size: int = Field(default=256, ge=1)
+
     # File Upload Settings
     max_file_size: int = Field(default=10 * 1024 * 1024) # 10MB
-    
+
+    # Analysis History Settings
+    history_enabled: bool = Field(default=False, description="Store analyses for GET /api/history (needs API_KEYS)")
+    history_dir: str = Field(default="history", description="Directory for the history databases")
+    history_partition_by_patient: bool = Field(default=False, description="One database file per patient")
+    history_batch_size: int = Field(default=200, ge=1, description="Records written per transaction")
+    history_flush_interval: float = Field(default=1.0, gt=0, description="Max seconds a record waits to be written")
+    history_max_connections: int = Field(default=64, ge=1, description="Open partition files kept by the writer")
+
+    # Chat Memory Settings
+    chat_history_backend: Literal["memory", "sqlite"] = Field(default="memory", description="Session store: memory (one worker only) or sqlite")
+    chat_history_db_path: str = Field(default="chat_history.db")
+    chat_history_max_turns: int = Field(default=6, ge=1, description="Recent turns kept verbatim")
+    chat_history_token_budget: int = Field(default=1500, ge=100, description="Max tokens of history per prompt")
+    chat_session_ttl: int = Field(default=3600, ge=60, description="Seconds before an idle session expires")
+
     class Config():
         env_file = ".env"
         case_sensitive = False
@@ -39,6 +115,23 @@ class Settings(BaseSettings):
     def cors_origin_list(self):
         """Convert Comma-separated CORS origins to List"""
         return [origin.strip() for origin in self.cors_origins.split(",")]
+
+    @property
+    def api_key_list(self):
+        """Convert Comma-separated API keys to List"""
+        return [key.strip() for key in self.api_keys.split(",") if key.strip()]
+
+    @field_validator("tenant_weights")
+    @classmethod
+    def check_tenant_weights(cls, value: str):
+        """Fail at startup on a bad weight instead of inside the scheduler"""
+        parse_tenant_weights(value)
+        return value
+
+    @property
+    def tenant_weight_map(self):
+        """Convert "clinic-a=3,clinic-b=1" to {"clinic-a": 3.0, "clinic-b": 1.0}"""
+        return parse_tenant_weights(self.tenant_weights)
     
 
 # Global Settings Instance
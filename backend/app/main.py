@@ -3,10 +3,23 @@ MediCare AI - FastAPI Main Application
 Entry point for the backend server with LangChain integration
 """
 
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 from app.config import settings
-from app.routes import health, analysis, research
+from app.responses import CompressionMiddleware
+from app.routes import health, analysis, research, scheduler, history
+from app.services.deadline import start_deadline, end_deadline, parse_timeout_header
+from app.services.scheduler import identify_request, set_identity, reset_identity
+from app.services.history_store import history_store
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield
+    # Write any queued history records before the process exits
+    history_store.close()
+
 
 # Create FastAPI app
 app = FastAPI(
@@ -14,7 +27,8 @@ app = FastAPI(
     description="Medical AI Assistant API for Cameroon 🏥 - Powered by LangChain",
     version="2.0.0",
     docs_url="/docs",
-    redoc_url="/redoc"
+    redoc_url="/redoc",
+    lifespan=lifespan
 )
 
 # Configure CORS
@@ -26,10 +40,42 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Compress large bodies (gzip, or brotli when installed)
+app.add_middleware(CompressionMiddleware, minimum_size=settings.compression_min_size)
+
+# Give every request a deadline (X-Request-Timeout header in seconds, or Settings)
+# Upstream calls share what is left of it and are cancelled when it runs out
+@app.middleware("http")
+async def request_deadline(request: Request, call_next):
+    token = start_deadline(parse_timeout_header(request.headers.get("x-request-timeout")))
+    try:
+        return await call_next(request)
+    finally:
+        end_deadline(token)
+
+
+# Tag every request with its tenant (its API key, or X-Tenant-ID without API_KEYS) and route priority
+# The upstream scheduler uses this to share Gemini/Tavily capacity fairly
+@app.middleware("http")
+async def request_identity(request: Request, call_next):
+    identity = identify_request(
+        request.url.path,
+        api_key=request.headers.get("x-api-key"),
+        tenant_id=request.headers.get("x-tenant-id")
+    )
+    token = set_identity(identity)
+    try:
+        return await call_next(request)
+    finally:
+        reset_identity(token)
+
+
 # Include routers
 app.include_router(health.router)
 app.include_router(analysis.router)
 app.include_router(research.router)
+app.include_router(scheduler.router)
+app.include_router(history.router)
 
 
 @app.get("/")
@@ -45,6 +91,8 @@ async def root():
 
 
 if __name__ == "__main__":
+    # Development server with auto-reload
+    # For production use `python -m app.serve` (multi-worker, see app/serve.py)
     import uvicorn
     uvicorn.run(
         "app.main:app",
@@ -17,12 +17,14 @@ class ChatRequest(BaseModel):
     
     message: str = Field(..., min_length=1, max_length=1000, description="User's medical question")
     language: str = Field(default="en", description="Response language (en/fr)")
+    session_id: str | None = Field(default=None, min_length=1, max_length=128, description="session_id from a previous response to continue that conversation")
 
 
 class ChatResponse(BaseModel):
    
     response: str
     language: str
+    session_id: str | None = None
     timestamp: datetime
 
 
@@ -31,6 +33,7 @@ class AnalysisRequest(BaseModel):
     text: str = Field(..., min_length=1, description="Medical record text to analyze")
     context: str = Field(default="", description="Additional context about the patient")
     language: str = Field(default="en", description="Response language")
+    patient_id: str | None = Field(default=None, min_length=1, max_length=128, description="Patient to file this analysis under")
 
 
 class MedicalAnalysis(BaseModel):
@@ -78,4 +81,45 @@ class ResearchResponse(BaseModel):
     query: str
     results: list[ResearchResult]
     summary: str
-    timestamp: datetime
\ No newline at end of file
+    timestamp: datetime
+
+
+class TenantQueueStats(BaseModel):
+    """Upstream queue statistics for one tenant"""
+    weight: float
+    queued: int
+    running: int
+    admitted: int
+    shed: int
+    avg_wait_seconds: float
+
+
+class SchedulerStatsResponse(BaseModel):
+    """Upstream scheduler snapshot (per worker process)"""
+    capacity: int
+    in_flight: int
+    queued: int
+    expected_wait_seconds: float
+    service_time_seconds: dict[str, float]
+    tenants: dict[str, TenantQueueStats]
+    timestamp: datetime
+
+
+class HistoryEntry(BaseModel):
+    """One stored analysis"""
+    id: int
+    patient_id: str
+    source: str
+    language: str
+    extracted_text: str
+    analysis: MedicalAnalysis | None
+    snippet: str | None = None
+    created_at: datetime
+
+
+class HistoryResponse(BaseModel):
+    """Page of analysis history"""
+    items: list[HistoryEntry]
+    next_cursor: int | None
+    query: str | None
+    timestamp: datetime
@@ -0,0 +1,195 @@
+"""
+Fast response layer for MediCare AI
+orjson serialization, gzip/brotli compression and ETags
+
+orjson and brotli are dependencies, but the code still falls back to
+Pydantic's JSON encoder and gzip-only compression without them.
+"""
+
+# Import libraries
+import gzip
+import hashlib
+import json
+from fastapi import Request, Response
+from pydantic import BaseModel
+from app.config import settings
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+def dump_json(content):
+    """Serialize a schema (or plain data) to JSON bytes as fast as we can"""
+    if isinstance(content, BaseModel):
+        # Pydantic's own serializer - model_dump() + orjson measured no faster
+        return content.model_dump_json().encode("utf-8")
+    if orjson is not None:
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(content, ensure_ascii=False, separators=(",", ":"), default=str).encode("utf-8")
+
+
+class FastJSONResponse(Response):
+    """
+    JSONResponse replacement that renders with dump_json
+
+    Not the app default: for response_model routes FastAPI already has
+    Pydantic write the bytes directly, which a custom class turns off.
+    Used by routes that return plain dicts (e.g. /api/extract-text).
+    """
+    media_type = "application/json"
+
+    def render(self, content):
+        return dump_json(content)
+
+
+def make_etag(body: bytes):
+    """Weak ETag - stays valid whatever Content-Encoding is applied later"""
+    return f'W/"{hashlib.blake2b(body, digest_size=16).hexdigest()}"'
+
+
+def etag_matches(request: Request, etag: str):
+    """Does the client already have this version (If-None-Match)?"""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    # Weak comparison - ignore the W/ prefix on both sides
+    candidates = {tag.strip().removeprefix("W/") for tag in header.split(",")}
+    return etag.removeprefix("W/") in candidates
+
+
+def cached_json_response(request: Request, body: bytes, etag: str, max_age: int):
+    """
+    Serve pre-rendered JSON with validators for conditional GET
+
+    Returns:
+        304 Not Modified if the client's copy is current, otherwise the body
+    """
+    headers = {"ETag": etag, "Cache-Control": f"private, max-age={max_age}"}
+    if etag_matches(request, etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+def _accepted_encodings(header: str):
+    """Parse Accept-Encoding into {encoding: q}"""
+    accepted = {}
+    for part in header.split(","):
+        name, _, params = part.strip().partition(";")
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        if name:
+            accepted[name.strip().lower()] = q
+    return accepted
+
+
+def choose_encoding(header: str):
+    """Pick brotli or gzip according to the client's preferences"""
+    accepted = _accepted_encodings(header)
+    available = ["br", "gzip"] if brotli is not None else ["gzip"]
+    options = [
+        (accepted.get(name, accepted.get("*", 0.0)), -rank, name)
+        for rank, name in enumerate(available)
+    ]
+    q, _, name = max(options)
+    return name if q > 0 else None
+
+
+def compress(body: bytes, encoding: str):
+    if encoding == "br":
+        return brotli.compress(body, quality=settings.brotli_quality)
+    return gzip.compress(body, compresslevel=settings.gzip_level)
+
+
+COMPRESSIBLE_TYPES = ("application/json", "text/")
+
+
+class CompressionMiddleware:
+    """
+    Compress response bodies above `compression_min_size`
+
+    Works on complete bodies only - streamed responses pass through unchanged.
+    """
+
+    def __init__(self, app, minimum_size: int):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        accept = ""
+        for name, value in scope["headers"]:
+            if name == b"accept-encoding":
+                accept = value.decode("latin-1")
+                break
+        encoding = choose_encoding(accept) if accept else None
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start_message = None
+
+        async def send_compressed(message):
+            nonlocal start_message
+            if message["type"] == "http.response.start":
+                # Hold the headers until we see the body
+                start_message = message
+                return
+
+            if message["type"] != "http.response.body" or start_message is None:
+                await send(message)
+                return
+
+            if message.get("more_body", False):
+                # Streaming - send as-is from here on
+                await send(start_message)
+                start_message = None
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            headers = [(k, v) for k, v in start_message["headers"]]
+            header_names = {k.lower() for k, _ in headers}
+            content_type = next((v.decode("latin-1") for k, v in headers if k.lower() == b"content-type"), "")
+
+            if (
+                len(body) >= self.minimum_size
+                and b"content-encoding" not in header_names
+                and content_type.startswith(COMPRESSIBLE_TYPES)
+            ):
+                body = compress(body, encoding)
+                headers = [(k, v) for k, v in headers if k.lower() != b"content-length"]
+                headers += [
+                    (b"content-encoding", encoding.encode()),
+                    (b"content-length", str(len(body)).encode()),
+                ]
+
+            # Caches must key on Accept-Encoding too (merge with e.g. CORS's Vary: Origin)
+            vary = [v for k, v in headers if k.lower() == b"vary"]
+            headers = [(k, v) for k, v in headers if k.lower() != b"vary"]
+            vary_values = [part.strip() for value in vary for part in value.split(b",") if part.strip()]
+            if b"accept-encoding" not in {part.lower() for part in vary_values}:
+                vary_values.append(b"Accept-Encoding")
+            headers.append((b"vary", b", ".join(vary_values)))
+
+            await send({**start_message, "headers": headers})
+            start_message = None
+            await send({**message, "body": body})
+
+        await self.app(scope, receive, send_compressed)
@@ -2,7 +2,7 @@
 Medical record analysis endpoints using LangChain
 """
 
-from fastapi import APIRouter, UploadFile, File, Form, HTTPException
+from fastapi import APIRouter, UploadFile, File, Form, Header, HTTPException
 from app.models.schemas import (
     ChatRequest, ChatResponse,
     AnalysisRequest, AnalysisResponse,
@@ -11,50 +11,102 @@ from app.models.schemas import (
 from app.chains.chat_chain import get_chat_response
 from app.chains.analysis_chain import analyze_medical_record
 from app.services.gemini_service import gemini_service
+from app.services.deadline import DeadlineExceeded
+from app.services.scheduler import Overloaded
+from app.services.history_store import history_store
+from app.services.chat_memory import chat_memory
+from app.auth import api_principal, require_principal
+from app.responses import FastJSONResponse
+from app.config import settings
 from datetime import datetime
 
 router = APIRouter(prefix="/api", tags=["Analysis"])
 
 
+def history_owner(api_key: str | None, patient_id: str | None):
+    """
+    Who a result is filed under in the history (None = don't store it)
+    
+    Only callers with a valid API key get history. Asking to file a result
+    under a patient without one is refused before any work is done.
+    """
+    if not settings.history_enabled:
+        return None
+    if patient_id:
+        return require_principal(api_key)
+    return api_principal(api_key)
+
+
+def save_to_history(owner, patient_id, source: str, language: str, extracted_text: str, analysis=None):
+    """Queue this result for GET /api/history (written in the background)"""
+    if owner:
+        history_store.record(
+            tenant=owner,
+            patient_id=patient_id,
+            source=source,
+            language=language,
+            extracted_text=extracted_text,
+            analysis=analysis.model_dump() if analysis else None
+        )
+
+
 @router.post("/chat", response_model=ChatResponse)
 async def chat_with_ai(request: ChatRequest):
     try:
+        # Continue the caller's session, or start a new one (ids are issued by the server)
+        session_id = await chat_memory.aresolve_session(request.session_id)
+        
         # Use LangChain chat chain
-        response_text = get_chat_response(
+        response_text = await get_chat_response(
             message=request.message,
-            language=request.language
+            language=request.language,
+            session_id=session_id
         )
         
         return ChatResponse(
             response=response_text,
             language=request.language,
+            session_id=session_id,
             timestamp=datetime.now()
         )
         
+    except Overloaded as e:
+        raise HTTPException(
+            status_code=503,
+            detail=f"Chat error: {str(e)}",
+            headers={"Retry-After": str(e.retry_after)}
+        )
+    except DeadlineExceeded as e:
+        raise HTTPException(status_code=504, detail=f"Chat error: {str(e)}")
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Chat error: {str(e)}")
 
 
 @router.post("/analyze-text", response_model=AnalysisResponse)
-async def analyze_medical_text(request: AnalysisRequest):
+async def analyze_medical_text(request: AnalysisRequest, x_api_key: str | None = Header(default=None)):
     """
     Analyze medical record text
     Uses LangChain analysis chain with structured output
     
     Args:
         request: Analysis request with text and optional context
+        x_api_key: Needed to file the analysis in the history
         
     Returns:
         Structured analysis
     """
+    owner = history_owner(x_api_key, request.patient_id)
+    
     try:
         # Use LangChain analysis chain
-        analysis = analyze_medical_record(
+        analysis = await analyze_medical_record(
             text=request.text,
             context=request.context,
             language=request.language
         )
         
+        save_to_history(owner, request.patient_id, "text", request.language, request.text, analysis)
+        
         disclaimer = (
             "⚠️ This analysis is for informational purposes only. "
             "Always consult qualified healthcare professionals for medical advice."
@@ -71,6 +123,14 @@ async def analyze_medical_text(request: AnalysisRequest):
             timestamp=datetime.now()
         )
         
+    except Overloaded as e:
+        raise HTTPException(
+            status_code=503,
+            detail=f"Analysis error: {str(e)}",
+            headers={"Retry-After": str(e.retry_after)}
+        )
+    except DeadlineExceeded as e:
+        raise HTTPException(status_code=504, detail=f"Analysis error: {str(e)}")
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Analysis error: {str(e)}")
 
@@ -79,7 +139,9 @@ async def analyze_medical_text(request: AnalysisRequest):
 async def analyze_medical_image(
     file: UploadFile = File(...),
     language: str = Form(default="en"),
-    extract_text_only: bool = Form(default=False)
+    extract_text_only: bool = Form(default=False),
+    patient_id: str | None = Form(default=None, min_length=1, max_length=128),
+    x_api_key: str | None = Header(default=None)
 ):
     """
     Analyze medical record image (lab results, hospital book, etc.)
@@ -90,6 +152,8 @@ async def analyze_medical_image(
         file: Image file upload
         language: Response language (en/fr)
         extract_text_only: If True, only extract text without analysis
+        patient_id: Optional patient to file the result under
+        x_api_key: Needed to file the result in the history
         
     Returns:
         Extracted text and analysis
@@ -98,14 +162,22 @@ async def analyze_medical_image(
     if not file.content_type.startswith("image/"):
         raise HTTPException(status_code=400, detail="File must be an image")
     
+    owner = history_owner(x_api_key, patient_id)
+    
     try:
         # Read image bytes
         image_bytes = await file.read()
         
         # Extract text from image using Gemini Vision
-        extracted_text = gemini_service.extract_text_from_image(image_bytes)
+        # Leave half of the remaining time for the analysis step
+        extracted_text = await gemini_service.extract_text_from_image(
+            image_bytes,
+            budget_share=1.0 if extract_text_only else 0.5
+        )
         
         if extract_text_only:
+            save_to_history(owner, patient_id, "image", language, extracted_text)
+            
             # Return only extracted text
             return ImageAnalysisResponse(
                 extracted_text=extracted_text,
@@ -121,11 +193,13 @@ async def analyze_medical_image(
             )
         
         # Perform full analysis using LangChain
-        analysis = analyze_medical_record(
+        analysis = await analyze_medical_record(
             text=extracted_text,
             language=language
         )
         
+        save_to_history(owner, patient_id, "image", language, extracted_text, analysis)
+        
         disclaimer = (
             "⚠️ This analysis is for informational purposes only. "
             "Always consult qualified healthcare professionals for medical advice."
@@ -144,17 +218,31 @@ async def analyze_medical_image(
             )
         )
         
+    except Overloaded as e:
+        raise HTTPException(
+            status_code=503,
+            detail=f"Image analysis error: {str(e)}",
+            headers={"Retry-After": str(e.retry_after)}
+        )
+    except DeadlineExceeded as e:
+        raise HTTPException(status_code=504, detail=f"Image analysis error: {str(e)}")
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Image analysis error: {str(e)}")
 
 
-@router.post("/extract-text")
-async def extract_text_from_image(file: UploadFile = File(...)):
+@router.post("/extract-text", response_class=FastJSONResponse)
+async def extract_text_from_image(
+    file: UploadFile = File(...),
+    patient_id: str | None = Form(default=None, min_length=1, max_length=128),
+    x_api_key: str | None = Header(default=None)
+):
     """
     Extract text from medical record image (OCR only)
     
     Args:
         file: Image file upload
+        patient_id: Optional patient to file the text under
+        x_api_key: Needed to file the text in the history
         
     Returns:
         Extracted text
@@ -162,15 +250,26 @@ async def extract_text_from_image(file: UploadFile = File(...)):
     if not file.content_type.startswith("image/"):
         raise HTTPException(status_code=400, detail="File must be an image")
     
+    owner = history_owner(x_api_key, patient_id)
+    
     try:
         image_bytes = await file.read()
-        extracted_text = gemini_service.extract_text_from_image(image_bytes)
+        extracted_text = await gemini_service.extract_text_from_image(image_bytes)
+        save_to_history(owner, patient_id, "image", "en", extracted_text)
         
         return {
             "extracted_text": extracted_text,
             "timestamp": datetime.now()
         }
         
+    except Overloaded as e:
+        raise HTTPException(
+            status_code=503,
+            detail=f"Text extraction error: {str(e)}",
+            headers={"Retry-After": str(e.retry_after)}
+        )
+    except DeadlineExceeded as e:
+        raise HTTPException(status_code=504, detail=f"Text extraction error: {str(e)}")
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Text extraction error: {str(e)}")
     
\ No newline at end of file
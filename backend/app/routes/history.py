@@ -0,0 +1,60 @@
+"""
+Analysis history endpoints
+"""
+
+from fastapi import APIRouter, Header, HTTPException, Query
+from app.models.schemas import HistoryResponse, HistoryEntry
+from app.services.history_store import history_store
+from app.auth import require_principal
+from app.config import settings
+from datetime import datetime
+import asyncio
+
+router = APIRouter(prefix="/api", tags=["History"])
+
+
+@router.get("/history", response_model=HistoryResponse)
+async def get_history(
+    patient_id: str | None = Query(default=None, min_length=1, max_length=128, description="Only this patient's records"),
+    q: str | None = Query(default=None, max_length=200, description="Full-text search in extracted text and findings"),
+    limit: int = Query(default=20, ge=1, le=100, description="Page size"),
+    cursor: int | None = Query(default=None, ge=1, description="next_cursor from the previous page"),
+    x_api_key: str | None = Header(default=None)
+):
+    """
+    Past analyses filed with the caller's API key, newest first
+
+    Records are written in batches, so an analysis can take up to
+    history_flush_interval seconds to appear here.
+
+    Returns:
+        One page of history and the cursor for the next one
+    """
+    if not settings.history_enabled:
+        raise HTTPException(status_code=404, detail="Analysis history is disabled")
+    owner = require_principal(x_api_key)
+    if settings.history_partition_by_patient and not patient_id:
+        raise HTTPException(status_code=400, detail="patient_id is required when history is partitioned per patient")
+
+    try:
+        # SQLite is blocking - keep it off the event loop
+        rows, next_cursor = await asyncio.to_thread(
+            history_store.search,
+            tenant=owner,
+            patient_id=patient_id,
+            query=q,
+            limit=limit,
+            cursor=cursor
+        )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"History error: {str(e)}")
+
+    return HistoryResponse(
+        items=[
+            HistoryEntry(**{**row, "created_at": datetime.fromtimestamp(row["created_at"])})
+            for row in rows
+        ],
+        next_cursor=next_cursor,
+        query=q,
+        timestamp=datetime.now()
+    )
@@ -2,23 +2,30 @@
 Medical research endpoints using Tavily + LangChain
 """
 
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Request, Response, Query
+from collections import OrderedDict
+import time
 from app.models.schemas import ResearchRequest, ResearchResponse, ResearchResult
 from app.services.tavily_service import tavily_service
 from app.chains.chat_chain import get_chat_response
+from app.services.deadline import DeadlineExceeded
+from app.services.scheduler import Overloaded
+from app.responses import dump_json, make_etag, cached_json_response
+from app.config import settings
 from datetime import datetime
 
 router = APIRouter(prefix="/api", tags=["Research"])
 
 
-@router.post("/research", response_model=ResearchResponse)
-async def search_medical_research(request: ResearchRequest):
+async def _run_research(request: ResearchRequest):
     
     try:
         # Search using Tavily
-        raw_results = tavily_service.search_medical_research(
+        # Search gets half the time budget, the summary gets the rest
+        raw_results = await tavily_service.search_medical_research(
             query=request.query,
-            max_results=request.max_results
+            max_results=request.max_results,
+            budget_share=0.5
         )
         
         # Format results
@@ -37,7 +44,7 @@ async def search_medical_research(request: ResearchRequest):
 Focus on the key takeaways and most important information."""
         
         # Use LangChain chat to generate summary
-        summary = get_chat_response(summary_prompt, request.language)
+        summary = await get_chat_response(summary_prompt, request.language)
         
         # Convert to ResearchResult models
         research_results = [
@@ -57,5 +64,78 @@ Focus on the key takeaways and most important information."""
             timestamp=datetime.now()
         )
         
+    except Overloaded as e:
+        raise HTTPException(
+            status_code=503,
+            detail=f"Research error: {str(e)}",
+            headers={"Retry-After": str(e.retry_after)}
+        )
+    except DeadlineExceeded as e:
+        raise HTTPException(status_code=504, detail=f"Research error: {str(e)}")
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Research error: {str(e)}")
+
+
+# Rendered responses: (query, max_results, language) -> (expires_at, body, etag)
+_research_cache: OrderedDict[tuple, tuple[float, bytes, str]] = OrderedDict()
+
+
+async def _cached_research(request: ResearchRequest):
+    """
+    Research results as JSON bytes, reused for identical queries
+    
+    The cache is per worker process. Under `app.serve` with several workers
+    a request that lands on a worker without the entry runs the search
+    again, even when the client sends If-None-Match.
+    
+    Returns:
+        Tuple of (body, etag, seconds until the entry expires)
+    """
+    key = (" ".join(request.query.lower().split()), request.max_results, request.language)
+    cached = _research_cache.get(key)
+    now = time.monotonic()
+    if cached and cached[0] > now:
+        _research_cache.move_to_end(key)
+        return cached[1], cached[2], int(cached[0] - now)
+    
+    response = await _run_research(request)
+    body = dump_json(response)
+    # Hash the content without the timestamp, so identical results get the
+    # same ETag whichever worker (or cache refill) produced them
+    etag = make_etag(dump_json(response.model_dump(exclude={"timestamp"})))
+    
+    if settings.research_cache_ttl:
+        _research_cache[key] = (time.monotonic() + settings.research_cache_ttl, body, etag)
+        _research_cache.move_to_end(key)
+        while len(_research_cache) > settings.research_cache_size:
+            _research_cache.popitem(last=False)
+    
+    return body, etag, settings.research_cache_ttl
+
+
+@router.post("/research", response_model=ResearchResponse)
+async def search_medical_research(request: ResearchRequest):
+    
+    body, etag, _ = await _cached_research(request)
+    return Response(content=body, media_type="application/json", headers={"ETag": etag})
+
+
+@router.get("/research", response_model=ResearchResponse)
+async def get_medical_research(
+    http_request: Request,
+    query: str = Query(..., min_length=3, max_length=200, description="Medical topic to research"),
+    max_results: int = Query(default=5, ge=1, le=10, description="Number of results"),
+    language: str = Query(default="en", description="Response language")
+):
+    """
+    Cacheable version of POST /api/research
+    Supports If-None-Match - unchanged results come back as 304 with no body
+    
+    Results are cached per worker. On a worker that hasn't seen the query the
+    search runs again, and only matches the client's ETag if Tavily and the
+    summary return the same content.
+    """
+    request = ResearchRequest(query=query, max_results=max_results, language=language)
+    body, etag, max_age = await _cached_research(request)
+    # Clients may reuse it only as long as our own copy is still fresh
+    return cached_json_response(http_request, body, etag, max_age)
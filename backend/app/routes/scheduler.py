@@ -0,0 +1,24 @@
+"""
+Upstream scheduler endpoints
+"""
+
+from fastapi import APIRouter
+from app.models.schemas import SchedulerStatsResponse
+from app.services.scheduler import upstream_scheduler
+from datetime import datetime
+
+router = APIRouter(prefix="/api", tags=["Scheduler"])
+
+
+@router.get("/scheduler/stats", response_model=SchedulerStatsResponse)
+async def scheduler_stats():
+    """
+    Per-tenant queue statistics for the Gemini/Tavily scheduler
+    
+    Returns:
+        Capacity, queue depth and per-tenant counters of this worker
+    """
+    return SchedulerStatsResponse(
+        **upstream_scheduler.stats(),
+        timestamp=datetime.now()
+    )
@@ -0,0 +1,288 @@
+"""
+Production server entry point for MediCare AI
+Pre-forking process manager around uvicorn, driven by Settings
+
+Usage (from backend/):
+    python -m app.serve
+
+Settings (env vars): WORKERS, EVENT_LOOP, HTTP_PARSER, PRELOAD_APP,
+GRACEFUL_TIMEOUT, MAX_REQUESTS, MAX_REQUESTS_JITTER, BACKLOG, KEEPALIVE_TIMEOUT
+
+With WORKERS > 1 set CHAT_HISTORY_BACKEND=sqlite - the in-memory chat store
+is per worker, so sessions would lose context between requests.
+
+A worker that crashes while starting is restarted with a growing delay; if
+it keeps failing the server shuts down with exit code 1.
+"""
+
+# Import libraries
+import importlib.util
+import logging
+import os
+import random
+import signal
+import sys
+import time
+import uvicorn
+from app.config import settings
+
+logger = logging.getLogger("uvicorn.error")
+
+# A worker that exits with an error sooner than this failed to start
+STARTUP_WINDOW = 10.0
+# First restart delay after a startup crash, doubled on every further crash
+STARTUP_BACKOFF = 0.5
+# Give up after this many startup crashes in a row
+MAX_STARTUP_FAILURES = 5
+
+
+def resolve_event_loop():
+    """
+    Use uvloop when it is installed, unless Settings says otherwise
+
+    Raises:
+        SystemExit: if EVENT_LOOP=uvloop but uvloop isn't installed
+    """
+    if settings.event_loop == "uvloop" and not importlib.util.find_spec("uvloop"):
+        raise SystemExit("EVENT_LOOP=uvloop but uvloop is not installed")
+    if settings.event_loop != "auto":
+        return settings.event_loop
+    return "uvloop" if importlib.util.find_spec("uvloop") else "asyncio"
+
+
+def resolve_http_parser():
+    """
+    Use httptools when it is installed, unless Settings says otherwise
+
+    Raises:
+        SystemExit: if HTTP_PARSER=httptools but httptools isn't installed
+    """
+    if settings.http_parser == "httptools" and not importlib.util.find_spec("httptools"):
+        raise SystemExit("HTTP_PARSER=httptools but httptools is not installed")
+    if settings.http_parser != "auto":
+        return settings.http_parser
+    return "httptools" if importlib.util.find_spec("httptools") else "h11"
+
+
+def preload():
+    """
+    Import the app and build the chains once in the parent process
+    Workers inherit the loaded modules, prompts and parsers instead of
+    building them again - only the LLM clients are replaced after fork
+    """
+    from app.main import app
+    from app.chains.chat_chain import create_chat_chain
+    from app.chains.analysis_chain import create_analysis_chain
+
+    for language in ("en", "fr"):
+        create_chat_chain(language)
+        create_analysis_chain(language)
+
+    return app
+
+
+def reset_upstream_clients():
+    """
+    Give a freshly forked worker its own Gemini/Tavily clients
+    Network clients (gRPC channels in particular) are not safe to share across fork
+
+    The preloaded prompts and parsers stay cached; the chains are only
+    re-piped around the new LLM client.
+    """
+    from tavily import AsyncTavilyClient
+    from app.config import load_google_llm, load_google_vision_llm
+    from app.chains.chat_chain import create_chat_chain
+    from app.chains.analysis_chain import create_analysis_chain
+    from app.services.gemini_service import gemini_service
+    from app.services.tavily_service import tavily_service
+
+    load_google_llm.cache_clear()
+    load_google_vision_llm.cache_clear()
+    create_chat_chain.cache_clear()
+    create_analysis_chain.cache_clear()
+
+    gemini_service.vision_llm = load_google_vision_llm()
+    tavily_service.client = AsyncTavilyClient(api_key=settings.tavily_api_key)
+
+    # Rebuild the chains before accepting traffic (cheap - prompts are cached)
+    for language in ("en", "fr"):
+        create_chat_chain(language)
+        create_analysis_chain(language)
+
+
+def build_config(app):
+    """uvicorn config shared by every worker"""
+    return uvicorn.Config(
+        app if settings.preload_app else "app.main:app",
+        host=settings.host,
+        port=settings.port,
+        loop=resolve_event_loop(),
+        http=resolve_http_parser(),
+        backlog=settings.backlog,
+        timeout_keep_alive=settings.keepalive_timeout,
+        timeout_graceful_shutdown=settings.graceful_timeout,
+        proxy_headers=True,
+    )
+
+
+class Supervisor:
+    """
+    Keeps `settings.workers` uvicorn processes running on one shared socket
+
+    - Workers exit on their own after max_requests and are replaced
+    - Workers that crash on startup are restarted with backoff, then given up on
+    - SIGTERM/SIGINT are forwarded so in-flight requests drain before exit
+    """
+
+    def __init__(self, config):
+        self.config = config
+        self.socket = config.bind_socket()
+        self.workers: dict[int, int] = {}  # pid -> worker number
+        self.started: dict[int, float] = {}  # worker number -> start time
+        self.failures: dict[int, int] = {}  # worker number -> startup crashes in a row
+        self.respawn_at: dict[int, float] = {}  # worker number -> when to restart it
+        self.stopping = False
+        self.exit_code = 0
+
+    def spawn(self, number: int):
+        pid = os.fork()
+        if pid:
+            self.workers[pid] = number
+            self.started[number] = time.monotonic()
+            return
+
+        # Child process - uvicorn installs its own signal handlers
+        signal.signal(signal.SIGTERM, signal.SIG_DFL)
+        signal.signal(signal.SIGINT, signal.SIG_DFL)
+        exit_code = 0
+        try:
+            if settings.preload_app:
+                reset_upstream_clients()
+            if settings.max_requests:
+                self.config.limit_max_requests = settings.max_requests + random.randint(
+                    0, settings.max_requests_jitter
+                )
+            uvicorn.Server(self.config).run(sockets=[self.socket])
+        except BaseException:
+            logger.exception("Worker %d crashed", os.getpid())
+            exit_code = 1
+        finally:
+            os._exit(exit_code)
+
+    def handle_stop(self, signum, frame):
+        if self.stopping:
+            return
+        logger.info("Received %s, draining %d worker(s)", signal.Signals(signum).name, len(self.workers))
+        self.stop()
+
+    def stop(self):
+        """Ask every worker to finish its requests and exit"""
+        self.stopping = True
+        for pid in self.workers:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    def reap(self):
+        """Collect exited workers, returning (worker number, exit code) pairs"""
+        exited = []
+        while self.workers:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                break
+            if pid == 0:
+                break
+            number = self.workers.pop(pid, None)
+            if number is not None:
+                code = os.waitstatus_to_exitcode(status)
+                exited.append((number, code))
+                logger.info("Worker %d exited with status %d", pid, code)
+        return exited
+
+    def schedule_respawn(self, number: int, code: int):
+        """Restart a worker now, later (crashed on startup) or not at all (crashing in a loop)"""
+        now = time.monotonic()
+        if code == 0 or now - self.started.get(number, now) >= STARTUP_WINDOW:
+            # Recycled, or crashed after serving for a while - replace it right away
+            self.failures[number] = 0
+            self.respawn_at[number] = now
+            return
+
+        failures = self.failures.get(number, 0) + 1
+        self.failures[number] = failures
+        if failures >= MAX_STARTUP_FAILURES:
+            logger.error("Worker %d failed to start %d times in a row, shutting down", number, failures)
+            self.exit_code = 1
+            self.stop()
+            return
+
+        delay = STARTUP_BACKOFF * 2 ** (failures - 1)
+        logger.warning("Worker %d crashed during startup, restarting in %.1fs", number, delay)
+        self.respawn_at[number] = now + delay
+
+    def run(self):
+        signal.signal(signal.SIGTERM, self.handle_stop)
+        signal.signal(signal.SIGINT, self.handle_stop)
+
+        logger.info(
+            "Starting %d worker(s) on %s:%d (loop=%s, http=%s)",
+            settings.workers, settings.host, settings.port, self.config.loop, self.config.http
+        )
+        for number in range(settings.workers):
+            self.spawn(number)
+
+        while not self.stopping:
+            for number, code in self.reap():
+                if not self.stopping:
+                    self.schedule_respawn(number, code)
+            now = time.monotonic()
+            for number, when in list(self.respawn_at.items()):
+                if when <= now and not self.stopping:
+                    del self.respawn_at[number]
+                    self.spawn(number)
+            time.sleep(0.2)
+
+        # Wait for in-flight requests to finish, then force the stragglers
+        deadline = time.monotonic() + settings.graceful_timeout + 5
+        while self.workers and time.monotonic() < deadline:
+            self.reap()
+            time.sleep(0.1)
+        for pid in list(self.workers):
+            logger.warning("Worker %d did not drain in time, killing it", pid)
+            os.kill(pid, signal.SIGKILL)
+        self.reap()
+        self.socket.close()
+        return self.exit_code
+
+
+def main():
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s:     %(message)s")
+    if settings.workers > 1 and settings.chat_history_backend == "memory":
+        logger.warning(
+            "CHAT_HISTORY_BACKEND=memory keeps sessions per worker - with %d workers "
+            "chat sessions will lose context. Use CHAT_HISTORY_BACKEND=sqlite.",
+            settings.workers
+        )
+    app = preload() if settings.preload_app else None
+    config = build_config(app)
+
+    if not hasattr(os, "fork"):
+        # No fork on this platform - fall back to uvicorn's own process manager
+        uvicorn.run(
+            "app.main:app",
+            host=settings.host,
+            port=settings.port,
+            workers=settings.workers,
+            loop=config.loop,
+            http=config.http,
+            timeout_graceful_shutdown=settings.graceful_timeout
+        )
+        return
+
+    return Supervisor(config).run()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
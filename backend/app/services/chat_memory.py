@@ -0,0 +1,338 @@
+"""
+Server-side conversation memory for /api/chat
+Keeps a compact rolling summary plus the last few turns per session
+"""
+
+# Import libraries
+import asyncio
+import json
+import os
+import secrets
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from langchain_core.messages import HumanMessage, AIMessage
+from app.config import settings
+
+
+def estimate_tokens(text: str):
+    """Rough token count (Gemini averages ~4 characters per token)"""
+    return len(text) // 4 + 1
+
+
+def _clip(text: str, limit: int):
+    """Shorten text to `limit` characters on a word boundary"""
+    text = " ".join(text.split())
+    if len(text) <= limit:
+        return text
+    return text[:limit].rsplit(" ", 1)[0] + "..."
+
+
+def _clip_tokens(text: str, tokens: int):
+    """Shorten text to about `tokens` tokens (unchanged if it already fits)"""
+    if estimate_tokens(text) <= tokens:
+        return text
+    return _clip(text, max((tokens - 1) * 4 - 3, 0))
+
+
+@dataclass
+class ChatSession:
+    """What we remember about one conversation"""
+    summary: str = ""
+    turns: list[tuple[str, str]] = field(default_factory=list)  # (user, assistant)
+    updated_at: float = field(default_factory=time.time)
+
+
+class InMemoryChatHistoryStore:
+    """
+    Per-process session store - fast, lost on restart
+
+    Not shared between workers: with WORKERS > 1 a session only remembers the
+    turns that happened to land on the same worker. Use the sqlite backend.
+    """
+
+    # Cheap dict lookups - fine to call on the event loop
+    blocking = False
+
+    def __init__(self, ttl: int, max_sessions: int = 10000):
+        self.ttl = ttl
+        self.max_sessions = max_sessions
+        self._sessions: OrderedDict[str, ChatSession] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, session_id: str):
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is None:
+                return None
+            if time.time() - session.updated_at > self.ttl:
+                del self._sessions[session_id]
+                return None
+            return session
+
+    def save(self, session_id: str, session: ChatSession):
+        with self._lock:
+            session.updated_at = time.time()
+            self._sessions[session_id] = session
+            self._sessions.move_to_end(session_id)
+            # Oldest sessions go first when we are over capacity
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+
+    def update(self, session_id: str, change):
+        """Apply `change` to a session (a new one if missing) as one atomic step"""
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is None or time.time() - session.updated_at > self.ttl:
+                session = ChatSession()
+            change(session)
+            session.updated_at = time.time()
+            self._sessions[session_id] = session
+            self._sessions.move_to_end(session_id)
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+            return session
+
+    def evict_expired(self):
+        cutoff = time.time() - self.ttl
+        with self._lock:
+            expired = [sid for sid, s in self._sessions.items() if s.updated_at < cutoff]
+            for session_id in expired:
+                del self._sessions[session_id]
+            return len(expired)
+
+
+class SQLiteChatHistoryStore:
+    """Session store on disk - survives restarts and is shared by workers"""
+
+    # Can wait on another worker's write lock - keep it off the event loop
+    blocking = True
+
+    UPSERT = """INSERT INTO chat_sessions (session_id, summary, turns, updated_at)
+        VALUES (?, ?, ?, ?)
+        ON CONFLICT(session_id) DO UPDATE SET
+            summary = excluded.summary,
+            turns = excluded.turns,
+            updated_at = excluded.updated_at"""
+
+    def __init__(self, path: str, ttl: int):
+        self.path = path
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._conn: sqlite3.Connection | None = None
+        self._pid = None
+        self._inherited: list[sqlite3.Connection] = []
+
+    def _connection(self):
+        """
+        Connection owned by this process (call with the lock held)
+
+        Opened on first use, so a pre-forking server never shares one with its
+        workers. A connection inherited across fork is left untouched - even
+        closing it from the child can corrupt the database.
+        """
+        if self._conn is not None and self._pid == os.getpid():
+            return self._conn
+        if self._conn is not None:
+            self._inherited.append(self._conn)
+
+        conn = sqlite3.connect(self.path, check_same_thread=False, timeout=5.0)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(
+            """CREATE TABLE IF NOT EXISTS chat_sessions (
+                session_id TEXT PRIMARY KEY,
+                summary TEXT NOT NULL,
+                turns TEXT NOT NULL,
+                updated_at REAL NOT NULL
+            )"""
+        )
+        conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_chat_sessions_updated ON chat_sessions(updated_at)"
+        )
+        conn.commit()
+        self._conn = conn
+        self._pid = os.getpid()
+        return conn
+
+    def _read(self, conn: sqlite3.Connection, session_id: str):
+        row = conn.execute(
+            "SELECT summary, turns, updated_at FROM chat_sessions WHERE session_id = ?",
+            (session_id,)
+        ).fetchone()
+        if row is None or time.time() - row[2] > self.ttl:
+            return None
+        return ChatSession(
+            summary=row[0],
+            turns=[tuple(turn) for turn in json.loads(row[1])],
+            updated_at=row[2]
+        )
+
+    def get(self, session_id: str):
+        with self._lock:
+            return self._read(self._connection(), session_id)
+
+    def save(self, session_id: str, session: ChatSession):
+        session.updated_at = time.time()
+        with self._lock:
+            conn = self._connection()
+            conn.execute(
+                self.UPSERT,
+                (session_id, session.summary, json.dumps(session.turns), session.updated_at)
+            )
+            conn.commit()
+
+    def update(self, session_id: str, change):
+        """
+        Apply `change` to a session (a new one if missing) as one atomic step
+
+        IMMEDIATE takes the write lock before reading, so two workers handling
+        the same session queue up instead of overwriting each other's turn.
+        """
+        with self._lock:
+            conn = self._connection()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                session = self._read(conn, session_id) or ChatSession()
+                change(session)
+                session.updated_at = time.time()
+                conn.execute(
+                    self.UPSERT,
+                    (session_id, session.summary, json.dumps(session.turns), session.updated_at)
+                )
+                conn.commit()
+            except BaseException:
+                conn.rollback()
+                raise
+            return session
+
+    def evict_expired(self):
+        with self._lock:
+            conn = self._connection()
+            cursor = conn.execute(
+                "DELETE FROM chat_sessions WHERE updated_at < ?",
+                (time.time() - self.ttl,)
+            )
+            conn.commit()
+            return cursor.rowcount
+
+
+class ChatMemory:
+    """
+    Bounded conversation history
+
+    Older turns are folded into a short summary so the prompt size stays
+    roughly constant no matter how long the conversation gets.
+    """
+
+    def __init__(self, store, max_turns: int, token_budget: int, sweep_every: int = 100):
+        self.store = store
+        self.max_turns = max_turns
+        self.token_budget = token_budget
+        self.summary_budget = token_budget // 4
+        self.sweep_every = sweep_every
+        self._writes = 0
+
+    def resolve_session(self, session_id: str | None):
+        """
+        Session id to use for a chat request
+
+        Ids are only ever generated here. An id the client made up (or one
+        that expired) starts a fresh session under a new random id, so
+        guessing or reusing a simple id never exposes someone else's chat.
+        """
+        if session_id and self.store.get(session_id) is not None:
+            return session_id
+        return secrets.token_urlsafe(24)
+
+    def load(self, session_id: str):
+        """
+        Get the prompt inputs for a session
+
+        Returns:
+            Tuple of (summary text, list of LangChain messages)
+        """
+        session = self.store.get(session_id)
+        if session is None:
+            return "", []
+
+        messages = []
+        for user_text, ai_text in session.turns:
+            messages.append(HumanMessage(content=user_text))
+            messages.append(AIMessage(content=ai_text))
+        return session.summary, messages
+
+    def record_turn(self, session_id: str, user_text: str, ai_text: str):
+        """Append a turn and compact the session back within budget"""
+        def add_turn(session: ChatSession):
+            session.turns.append((user_text, ai_text))
+            self._compact(session)
+
+        self.store.update(session_id, add_turn)
+
+        # Expired sessions are swept occasionally instead of on every request
+        self._writes += 1
+        if self._writes % self.sweep_every == 0:
+            self.store.evict_expired()
+
+    # ---------- Async versions for request handlers ----------
+
+    async def _call(self, func, *args):
+        # SQLite can block on disk or another worker's lock - run it in a thread
+        if self.store.blocking:
+            return await asyncio.to_thread(func, *args)
+        return func(*args)
+
+    async def aresolve_session(self, session_id: str | None):
+        return await self._call(self.resolve_session, session_id)
+
+    async def aload(self, session_id: str):
+        return await self._call(self.load, session_id)
+
+    async def arecord_turn(self, session_id: str, user_text: str, ai_text: str):
+        await self._call(self.record_turn, session_id, user_text, ai_text)
+
+    def _tokens(self, session: ChatSession):
+        return estimate_tokens(session.summary) + sum(
+            estimate_tokens(u) + estimate_tokens(a) for u, a in session.turns
+        )
+
+    def _compact(self, session: ChatSession):
+        # Move the oldest turns into the summary until we fit
+        while len(session.turns) > 1 and (
+            len(session.turns) > self.max_turns or self._tokens(session) > self.token_budget
+        ):
+            user_text, ai_text = session.turns.pop(0)
+            line = f"- User: {_clip(user_text, 160)} | Assistant: {_clip(ai_text, 160)}"
+            session.summary = f"{session.summary}\n{line}".strip()
+
+        # Keep the summary itself bounded by dropping its oldest lines
+        lines = session.summary.splitlines()
+        while len(lines) > 1 and estimate_tokens("\n".join(lines)) > self.summary_budget:
+            lines.pop(0)
+        session.summary = "\n".join(lines)
+
+        # A single long turn can still be over budget - clip it to what is left
+        if self._tokens(session) > self.token_budget:
+            user_text, ai_text = session.turns[-1]
+            room = self.token_budget - estimate_tokens(session.summary)
+            # The question gets at most half unless the answer needs less
+            user_text = _clip_tokens(user_text, max(room // 2, room - estimate_tokens(ai_text)))
+            ai_text = _clip_tokens(ai_text, room - estimate_tokens(user_text))
+            session.turns[-1] = (user_text, ai_text)
+
+
+def create_history_store():
+    """Build the session store selected in Settings"""
+    if settings.chat_history_backend == "sqlite":
+        return SQLiteChatHistoryStore(settings.chat_history_db_path, settings.chat_session_ttl)
+    return InMemoryChatHistoryStore(settings.chat_session_ttl)
+
+
+# Global memory instance
+chat_memory = ChatMemory(
+    create_history_store(),
+    max_turns=settings.chat_history_max_turns,
+    token_budget=settings.chat_history_token_budget
+)
@@ -0,0 +1,211 @@
+"""
+Request deadlines and hedged upstream calls
+Every upstream call runs as a "stage" with a slice of the request's time budget
+"""
+
+# Import libraries
+import asyncio
+import contextvars
+import time
+from collections import deque
+from app.config import settings
+from app.services.scheduler import upstream_scheduler
+
+
+class DeadlineExceeded(Exception):
+    """The request ran out of time before a stage could finish"""
+
+
+class Deadline:
+    """Absolute point in time by which the whole request must be done"""
+
+    def __init__(self, timeout: float):
+        self.timeout = timeout
+        self.expires_at = time.monotonic() + timeout
+
+    def remaining(self):
+        return max(self.expires_at - time.monotonic(), 0.0)
+
+
+# Deadline of the request currently being handled (None outside a request)
+_current_deadline: contextvars.ContextVar[Deadline | None] = contextvars.ContextVar(
+    "request_deadline", default=None
+)
+
+
+def start_deadline(timeout: float):
+    """Set the deadline for the current request, returns a token for end_deadline"""
+    return _current_deadline.set(Deadline(timeout))
+
+
+def end_deadline(token):
+    _current_deadline.reset(token)
+
+
+def get_deadline():
+    return _current_deadline.get()
+
+
+def parse_timeout_header(value: str | None):
+    """
+    Read a client timeout header (seconds) capped by Settings
+
+    Returns:
+        Timeout in seconds
+    """
+    timeout = settings.request_timeout
+    if value:
+        try:
+            requested = float(value)
+        except ValueError:
+            return timeout
+        if requested > 0:
+            timeout = min(requested, settings.max_request_timeout)
+    return timeout
+
+
+class LatencyTracker:
+    """Recent successful latencies of one stage"""
+
+    def __init__(self, window: int = 200):
+        self.samples: deque[float] = deque(maxlen=window)
+
+    def record(self, seconds: float):
+        self.samples.append(seconds)
+
+    def percentile(self, pct: float):
+        """Latency at `pct`, or None until we have enough samples"""
+        if len(self.samples) < settings.hedge_min_samples:
+            return None
+        ordered = sorted(self.samples)
+        return ordered[min(int(len(ordered) * pct / 100), len(ordered) - 1)]
+
+
+class HedgeBudget:
+    """
+    Caps hedged requests to a fraction of normal traffic
+
+    Every call earns `ratio` tokens and every hedge spends one, so with
+    ratio=0.1 at most ~10% extra upstream calls are made.
+    """
+
+    def __init__(self, ratio: float, burst: float = 10.0):
+        self.ratio = ratio
+        self.burst = burst
+        self.tokens = 0.0
+        self.hedges = 0
+
+    def earn(self):
+        self.tokens = min(self.tokens + self.ratio, self.burst)
+
+    def try_spend(self):
+        if self.tokens < 1.0:
+            return False
+        self.tokens -= 1.0
+        self.hedges += 1
+        return True
+
+
+# Per-stage statistics, shared by all requests in this process
+latency_trackers: dict[str, LatencyTracker] = {}
+hedge_budget = HedgeBudget(settings.hedge_max_ratio)
+
+
+async def _first_success(tasks: set[asyncio.Task]):
+    """Whichever task succeeds first (or raise the last error)"""
+    error = None
+    while tasks:
+        done, tasks = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+        for task in done:
+            if task.exception() is None:
+                return task
+            error = task.exception()
+    raise error
+
+
+async def _hedged(tracker: LatencyTracker, call):
+    """
+    Start `call`; if it is slower than usual, race a duplicate against it
+
+    The duplicate needs an upstream slot of its own. It never queues for
+    one - if the scheduler is full we just keep waiting on the original.
+
+    Returns:
+        Tuple of (result, True if the duplicate won)
+    """
+    hedge_after = tracker.percentile(settings.hedge_percentile)
+    primary = asyncio.ensure_future(call())
+    tasks = {primary}
+    try:
+        if hedge_after is not None:
+            done, _ = await asyncio.wait(tasks, timeout=hedge_after)
+            if not done and upstream_scheduler.try_acquire():
+                if hedge_budget.try_spend():
+                    hedge = asyncio.ensure_future(call())
+                    # Runs on cancellation too, even before the task starts
+                    hedge.add_done_callback(lambda _: upstream_scheduler.release())
+                    tasks.add(hedge)
+                else:
+                    upstream_scheduler.release()
+        winner = await _first_success(tasks)
+        return winner.result(), winner is not primary
+    finally:
+        # Losers (or everything, if we were cancelled) stop here
+        for task in tasks:
+            task.cancel()
+
+
+async def run_stage(stage: str, call, share: float = 1.0, hedge: bool = False):
+    """
+    Run one upstream call within the request's remaining time
+
+    Args:
+        stage: Name used for latency tracking and error messages
+        call: Function returning a fresh coroutine (called twice when hedging)
+        share: Fraction of the remaining budget this stage may use
+        hedge: Call is idempotent and may be duplicated when slow
+
+    Returns:
+        The call's result
+
+    Raises:
+        DeadlineExceeded: The stage's budget ran out (the call is cancelled)
+        Overloaded: The scheduler expects the queue wait to outlast the deadline
+    """
+    tracker = latency_trackers.setdefault(stage, LatencyTracker())
+
+    deadline = get_deadline()
+    if deadline is not None and deadline.remaining() <= 0:
+        raise DeadlineExceeded(f"No time left for {stage}")
+
+    # Wait for a fair share of upstream capacity - queueing counts against the deadline
+    max_wait = deadline.remaining() if deadline is not None else None
+    async with upstream_scheduler.slot(max_wait=max_wait):
+        timeout = None
+        if deadline is not None:
+            remaining = deadline.remaining()
+            if remaining <= 0:
+                raise DeadlineExceeded(f"{stage} spent its budget waiting for a slot")
+            timeout = remaining * share
+
+        hedged = hedge and settings.hedge_enabled
+        if hedged:
+            hedge_budget.earn()
+            coro = _hedged(tracker, call)
+        else:
+            coro = call()
+
+        start = time.monotonic()
+        try:
+            result = await asyncio.wait_for(coro, timeout)
+        except TimeoutError:
+            raise DeadlineExceeded(f"{stage} exceeded its {timeout:.1f}s budget") from None
+
+        hedge_won = False
+        if hedged:
+            result, hedge_won = result
+        # When the duplicate wins we never learn how long the original call
+        # would have taken - recording the race time would drag the p95 down
+        if not hedge_won:
+            tracker.record(time.monotonic() - start)
+        return result
@@ -5,6 +5,8 @@ Handles image processing and vision tasks
 
 from langchain_core.messages import HumanMessage
 from app.config import load_google_vision_llm
+from app.services.deadline import run_stage, DeadlineExceeded
+from app.services.scheduler import Overloaded
 from PIL import Image
 import io
 import base64
@@ -17,7 +19,7 @@ class GeminiService:
   
         self.vision_llm = load_google_vision_llm()
     
-    def extract_text_from_image(self, image_bytes: bytes):
+    async def extract_text_from_image(self, image_bytes: bytes, budget_share: float = 1.0):
       
         try:
             # Convert image bytes to base64
@@ -49,21 +51,29 @@ Extract all text now:"""
                 ]
             )
             
-            # Invoke the vision model
-            response = self.vision_llm.invoke([message])
+            # Invoke the vision model within this stage's time budget
+            response = await run_stage(
+                "gemini.extract_text",
+                lambda: self.vision_llm.ainvoke([message]),
+                share=budget_share,
+                hedge=True
+            )
             
             return response.content
             
+        except (DeadlineExceeded, Overloaded):
+            raise
         except Exception as e:
             raise Exception(f"Image text extraction error: {str(e)}")
     
-    def analyze_image_directly(self, image_bytes: bytes, language: str = "en"):
+    async def analyze_image_directly(self, image_bytes: bytes, language: str = "en", budget_share: float = 1.0):
         """
         Directly analyze medical image and return structured analysis
         
         Args:
             image_bytes: Image file bytes
             language: Response language
+            budget_share: Fraction of the request's remaining time to use
             
         Returns:
             Dictionary with analysis
@@ -102,7 +112,12 @@ Respond ONLY with valid JSON."""
             )
             
             # Invoke vision model
-            response = self.vision_llm.invoke([message])
+            response = await run_stage(
+                "gemini.analyze_image",
+                lambda: self.vision_llm.ainvoke([message]),
+                share=budget_share,
+                hedge=True
+            )
             
             # Parse JSON response
             import json
@@ -116,6 +131,8 @@ Respond ONLY with valid JSON."""
                 "recommendations": ["Consult with a healthcare professional"],
                 "next_steps": ["Schedule appointment with your doctor"]
             }
+        except (DeadlineExceeded, Overloaded):
+            raise
         except Exception as e:
             raise Exception(f"Image analysis error: {str(e)}")
 
@@ -0,0 +1,313 @@
+"""
+Analysis history store
+Keeps extracted text and MedicalAnalysis results in SQLite with FTS5 search
+"""
+
+# Import libraries
+import hashlib
+import json
+import logging
+import queue
+import re
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS analyses (
+    id INTEGER PRIMARY KEY,
+    tenant TEXT NOT NULL,
+    patient_id TEXT NOT NULL,
+    source TEXT NOT NULL,
+    language TEXT NOT NULL,
+    extracted_text TEXT NOT NULL,
+    findings TEXT NOT NULL,
+    analysis TEXT,
+    scope TEXT NOT NULL,
+    created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_analyses_patient ON analyses(tenant, patient_id, id);
+CREATE INDEX IF NOT EXISTS idx_analyses_tenant ON analyses(tenant, id);
+
+-- Index over the analyses table (no second copy of the text)
+-- scope holds hashed tenant/patient tokens so a search stays inside one patient
+CREATE VIRTUAL TABLE IF NOT EXISTS analyses_fts USING fts5(
+    extracted_text, findings, scope,
+    content='analyses', content_rowid='id', tokenize='unicode61 remove_diacritics 2'
+);
+"""
+
+
+@dataclass
+class HistoryRecord:
+    """One analysis waiting to be written"""
+    tenant: str
+    patient_id: str
+    source: str
+    language: str
+    extracted_text: str
+    analysis: dict | None
+    created_at: float
+
+
+def _token(prefix: str, *parts: str):
+    """Single FTS token identifying a tenant or patient"""
+    digest = hashlib.sha256("\0".join(parts).encode()).hexdigest()[:20]
+    return f"{prefix}{digest}"
+
+
+def fts_query(text: str):
+    """Turn free text into a safe FTS5 query (every word must match, last one as prefix)"""
+    words = re.findall(r"\w+", text)
+    if not words:
+        return None
+    terms = [f'"{w}"' for w in words[:-1]] + [f'"{words[-1]}"*']
+    return " ".join(terms)
+
+
+def _connect(path: Path, readonly: bool = False):
+    if readonly:
+        conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True, timeout=5.0, check_same_thread=False)
+    else:
+        conn = sqlite3.connect(path, timeout=5.0, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.executescript(SCHEMA)
+    conn.row_factory = sqlite3.Row
+    return conn
+
+
+class HistoryStore:
+    """
+    Persistent analysis history
+
+    Writes are queued and flushed in batches by a background thread, so the
+    request never waits on disk. With partitioning on, each patient gets their
+    own database file and queries never touch anyone else's rows.
+    """
+
+    def __init__(self, directory: str, partition_by_patient: bool,
+                 batch_size: int, flush_interval: float, max_pending: int = 10000):
+        self.directory = Path(directory)
+        self.partition_by_patient = partition_by_patient
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._pending: queue.Queue[HistoryRecord | None] = queue.Queue(maxsize=max_pending)
+        self._writer: threading.Thread | None = None
+        self._writer_lock = threading.Lock()
+        self._flushed = threading.Condition()
+        self._written = 0
+        self._queued = 0
+
+    # ---------- Paths ----------
+
+    def db_path(self, tenant: str, patient_id: str):
+        if self.partition_by_patient:
+            name = _token("p", tenant, patient_id)
+            return self.directory / "patients" / name[1:3] / f"{name}.db"
+        return self.directory / "history.db"
+
+    # ---------- Writing ----------
+
+    def record(self, tenant: str, patient_id: str | None, source: str, language: str,
+               extracted_text: str, analysis: dict | None = None):
+        """Queue an analysis for storage (never blocks the request)"""
+        if self.partition_by_patient and not patient_id:
+            # Partitioned history is only readable per patient - this could never be found
+            logger.debug("Not storing a %s record without patient_id (history is partitioned)", source)
+            return
+        self._ensure_writer()
+        item = HistoryRecord(
+            tenant=tenant,
+            patient_id=patient_id or "",
+            source=source,
+            language=language,
+            extracted_text=extracted_text,
+            analysis=analysis,
+            created_at=time.time()
+        )
+        try:
+            self._pending.put_nowait(item)
+            self._queued += 1
+        except queue.Full:
+            logger.warning("History queue is full, dropping a %s record", source)
+
+    def _ensure_writer(self):
+        # Started lazily so a pre-forking server never forks with a live thread
+        if self._writer is not None and self._writer.is_alive():
+            return
+        with self._writer_lock:
+            if self._writer is None or not self._writer.is_alive():
+                self._writer = threading.Thread(target=self._run_writer, name="history-writer", daemon=True)
+                self._writer.start()
+
+    def _run_writer(self):
+        connections: dict[Path, sqlite3.Connection] = {}
+        stop = False
+        while not stop:
+            batch = []
+            try:
+                item = self._pending.get(timeout=self.flush_interval)
+                if item is None:
+                    stop = True
+                else:
+                    batch.append(item)
+                # Collect whatever else is waiting, up to one batch
+                while len(batch) < self.batch_size:
+                    item = self._pending.get_nowait()
+                    if item is None:
+                        stop = True
+                        break
+                    batch.append(item)
+            except queue.Empty:
+                pass
+
+            if batch:
+                try:
+                    self.write_batch(batch, connections)
+                except Exception:
+                    # Disk or permission problems too - log, drop the batch, keep the writer alive
+                    logger.exception("Failed to write %d history records", len(batch))
+                with self._flushed:
+                    self._written += len(batch)
+                    self._flushed.notify_all()
+
+            # Don't keep too many partition files open
+            while len(connections) > settings.history_max_connections:
+                connections.pop(next(iter(connections))).close()
+
+        for conn in connections.values():
+            conn.close()
+
+    def write_batch(self, batch: list[HistoryRecord], connections: dict | None = None):
+        """Insert records, one transaction per database file"""
+        connections = {} if connections is None else connections
+        groups: dict[Path, list[HistoryRecord]] = {}
+        for record in batch:
+            groups.setdefault(self.db_path(record.tenant, record.patient_id), []).append(record)
+
+        for path, records in groups.items():
+            conn = connections.get(path)
+            if conn is None:
+                path.parent.mkdir(parents=True, exist_ok=True)
+                conn = connections[path] = _connect(path)
+            rows = []
+            for r in records:
+                findings = " ".join(
+                    [r.analysis.get("summary", "")] + r.analysis.get("key_findings", [])
+                ) if r.analysis else ""
+                rows.append((
+                    r.tenant, r.patient_id, r.source, r.language, r.extracted_text, findings,
+                    json.dumps(r.analysis) if r.analysis else None,
+                    f"{_token('t', r.tenant)} {_token('p', r.tenant, r.patient_id)}",
+                    r.created_at
+                ))
+
+            # IMMEDIATE takes the write lock up front, so the new ids are all > last_id
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                last_id = conn.execute("SELECT COALESCE(MAX(id), 0) FROM analyses").fetchone()[0]
+                conn.executemany(
+                    """INSERT INTO analyses
+                    (tenant, patient_id, source, language, extracted_text, findings, analysis, scope, created_at)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+                    rows
+                )
+                conn.execute(
+                    """INSERT INTO analyses_fts (rowid, extracted_text, findings, scope)
+                    SELECT id, extracted_text, findings, scope FROM analyses WHERE id > ?""",
+                    (last_id,)
+                )
+                conn.commit()
+            except sqlite3.Error:
+                conn.rollback()
+                raise
+
+    def flush(self, timeout: float = 10.0):
+        """Wait until everything queued so far is on disk"""
+        target = self._queued
+        with self._flushed:
+            self._flushed.wait_for(lambda: self._written >= target, timeout=timeout)
+
+    def close(self):
+        """Flush pending records and stop the writer"""
+        if self._writer is None:
+            return
+        self._pending.put(None)
+        self._writer.join(timeout=30)
+        self._writer = None
+
+    # ---------- Reading ----------
+
+    def search(self, tenant: str, patient_id: str | None = None, query: str | None = None,
+               limit: int = 20, cursor: int | None = None):
+        """
+        Newest-first page of history, optionally full-text filtered
+
+        Args:
+            tenant: Only this tenant's records are visible
+            patient_id: Restrict to one patient (required when partitioned)
+            query: Free text matched against extracted text and findings
+            limit: Page size
+            cursor: Return records older than this id (from the previous page)
+
+        Returns:
+            Tuple of (list of row dicts, next cursor or None)
+        """
+        path = self.db_path(tenant, patient_id or "")
+        if not path.exists():
+            return [], None
+
+        conn = _connect(path, readonly=True)
+        try:
+            match = fts_query(query) if query else None
+            if query and match is None:
+                return [], None
+
+            if match:
+                # FTS5 walks its rowids newest-first, so deep pages stay cheap
+                scope = _token("p", tenant, patient_id) if patient_id else _token("t", tenant)
+                sql = """SELECT a.*, snippet(analyses_fts, 0, '[', ']', '...', 12) AS snippet
+                    FROM analyses_fts JOIN analyses a ON a.id = analyses_fts.rowid
+                    WHERE analyses_fts MATCH ?"""
+                params = [f'scope:"{scope}" AND ({match})']
+                if cursor is not None:
+                    sql += " AND analyses_fts.rowid < ?"
+                    params.append(cursor)
+                sql += " ORDER BY analyses_fts.rowid DESC LIMIT ?"
+            else:
+                sql = "SELECT *, NULL AS snippet FROM analyses WHERE tenant = ?"
+                params = [tenant]
+                if patient_id:
+                    sql += " AND patient_id = ?"
+                    params.append(patient_id)
+                if cursor is not None:
+                    sql += " AND id < ?"
+                    params.append(cursor)
+                sql += " ORDER BY id DESC LIMIT ?"
+            params.append(limit + 1)
+            rows = conn.execute(sql, params).fetchall()
+        finally:
+            conn.close()
+
+        # One extra row tells us whether there is another page
+        next_cursor = rows[limit - 1]["id"] if len(rows) > limit else None
+        items = [dict(row) for row in rows[:limit]]
+        for item in items:
+            item["analysis"] = json.loads(item["analysis"]) if item["analysis"] else None
+            del item["scope"], item["findings"], item["tenant"]
+        return items, next_cursor
+
+
+# Global history store
+history_store = HistoryStore(
+    directory=settings.history_dir,
+    partition_by_patient=settings.history_partition_by_patient,
+    batch_size=settings.history_batch_size,
+    flush_interval=settings.history_flush_interval
+)
@@ -0,0 +1,313 @@
+"""
+Fair scheduling of upstream (Gemini/Tavily) calls across tenants
+Weighted fair queuing with per-route priority classes and load shedding
+"""
+
+# Import libraries
+import asyncio
+import contextvars
+import heapq
+import math
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from app.auth import api_principal
+from app.config import settings
+
+
+class Overloaded(Exception):
+    """The request would wait longer than it is allowed to - shed it"""
+
+    def __init__(self, message: str, retry_after: float):
+        super().__init__(message)
+        self.retry_after = max(1, math.ceil(retry_after))
+
+
+# Priority classes - higher weight gets a bigger share of upstream capacity
+PRIORITY_WEIGHTS = {
+    "interactive": 4.0,
+    "standard": 2.0,
+    "bulk": 1.0,
+}
+
+# Route -> priority class (anything else is "standard")
+ROUTE_PRIORITIES = {
+    "/api/chat": "interactive",
+    "/api/research": "standard",
+    "/api/analyze-text": "standard",
+    "/api/analyze-image": "bulk",
+    "/api/extract-text": "bulk",
+}
+
+
+@dataclass
+class RequestIdentity:
+    tenant: str
+    priority: str
+
+
+# Tenant and priority class of the request being handled
+_current_identity: contextvars.ContextVar[RequestIdentity] = contextvars.ContextVar(
+    "request_identity", default=RequestIdentity("anonymous", "standard")
+)
+
+
+def identify_request(path: str, api_key: str | None, tenant_id: str | None):
+    """
+    Work out who is calling and how urgent the route is
+
+    - With API_KEYS set, the tenant is the key's principal ("key-<hash>",
+      the same id history uses) and X-Tenant-ID is ignored
+    - Without API_KEYS, X-Tenant-ID is trusted (e.g. set by a gateway),
+      but only for tenants named in TENANT_WEIGHTS
+    - Everyone else - unknown keys, made-up tenant ids - shares "anonymous"
+    """
+    if settings.api_key_list:
+        tenant = api_principal(api_key) or "anonymous"
+    elif tenant_id and tenant_id.strip() in upstream_scheduler.tenant_weights:
+        tenant = tenant_id.strip()
+    else:
+        tenant = "anonymous"
+    return RequestIdentity(tenant, ROUTE_PRIORITIES.get(path.rstrip("/"), "standard"))
+
+
+def set_identity(identity: RequestIdentity):
+    return _current_identity.set(identity)
+
+
+def reset_identity(token):
+    _current_identity.reset(token)
+
+
+@dataclass
+class TenantStats:
+    weight: float
+    queued: int = 0
+    running: int = 0
+    admitted: int = 0
+    shed: int = 0
+    total_wait: float = 0.0
+
+
+@dataclass(order=True)
+class _Waiter:
+    finish: float
+    seq: int
+    start: float = field(compare=False)
+    flow: tuple = field(compare=False)
+    priority: str = field(compare=False)
+    future: asyncio.Future = field(compare=False)
+    enqueued_at: float = field(compare=False)
+
+
+class FairScheduler:
+    """
+    Hands out a fixed number of upstream slots
+
+    Each (tenant, priority class) is a flow in a weighted fair queue.
+    Cost of a call is the recent average service time of its class, so a
+    tenant doing bulk image uploads cannot crowd out everyone's chat.
+
+    identify_request only lets known tenants through, but as a safety net
+    at most `max_tenants` are tracked.
+    Idle tenants are forgotten first; if all of them are busy, newcomers
+    share the "anonymous" flow.
+    """
+
+    def __init__(self, capacity: int, max_queue: int, tenant_weights: dict[str, float],
+                 default_weight: float, max_tenants: int = 1000):
+        self.capacity = capacity
+        self.max_queue = max_queue
+        self.tenant_weights = tenant_weights
+        self.default_weight = default_weight
+        self.max_tenants = max_tenants
+        self.in_flight = 0
+        self.virtual_time = 0.0
+        self._seq = 0
+        self._queue: list[_Waiter] = []
+        self._flow_finish: dict[tuple, float] = {}
+        # Least recently seen tenant first
+        self.tenants: OrderedDict[str, TenantStats] = OrderedDict()
+        # Running average seconds a slot is held, per priority class
+        self.service_time = {priority: 1.0 for priority in PRIORITY_WEIGHTS}
+
+    def _tenant(self, tenant: str):
+        """
+        Stats for a tenant, registering it if there is room
+
+        Returns:
+            Tuple of (tenant name actually used, TenantStats)
+        """
+        if tenant not in self.tenants and len(self.tenants) >= self.max_tenants:
+            if not self._evict_idle_tenant():
+                tenant = "anonymous"
+
+        stats = self.tenants.get(tenant)
+        if stats is None:
+            weight = self.tenant_weights.get(tenant, self.default_weight)
+            stats = self.tenants[tenant] = TenantStats(weight=weight)
+        self.tenants.move_to_end(tenant)
+        return tenant, stats
+
+    def _evict_idle_tenant(self):
+        """Forget the least recently seen tenant with nothing queued or running"""
+        for tenant, stats in self.tenants.items():
+            if tenant != "anonymous" and stats.queued == 0 and stats.running == 0:
+                del self.tenants[tenant]
+                return True
+        return False
+
+    def _prune_flows(self):
+        # Drop flows of forgotten tenants, and finish tags the virtual clock has passed
+        self._flow_finish = {
+            flow: finish for flow, finish in self._flow_finish.items()
+            if flow[0] in self.tenants and finish > self.virtual_time
+        }
+
+    def _queued(self):
+        return [w for w in self._queue if not w.future.done()]
+
+    def expected_wait(self, finish: float | None = None):
+        """Seconds until a new call (or one with this finish tag) would get a slot"""
+        ahead = [w for w in self._queued() if finish is None or w.finish < finish]
+        if self.in_flight < self.capacity and not ahead:
+            return 0.0
+        work_ahead = sum(self.service_time[w.priority] for w in ahead)
+        return (work_ahead + min(self.service_time.values())) / self.capacity
+
+    @asynccontextmanager
+    async def slot(self, max_wait: float | None = None):
+        """
+        Hold one upstream slot for the duration of the block
+
+        Args:
+            max_wait: Seconds this call can afford to queue (its remaining deadline)
+
+        Raises:
+            Overloaded: The queue is full or the expected wait exceeds max_wait
+        """
+        identity = _current_identity.get()
+        tenant, stats = self._tenant(identity.tenant)
+        waited = await self._acquire(tenant, identity.priority, stats, max_wait)
+        stats.admitted += 1
+        stats.running += 1
+        stats.total_wait += waited
+        start = time.monotonic()
+        try:
+            yield
+        finally:
+            stats.running -= 1
+            elapsed = time.monotonic() - start
+            previous = self.service_time[identity.priority]
+            self.service_time[identity.priority] = 0.8 * previous + 0.2 * elapsed
+            self._release()
+
+    def try_acquire(self):
+        """Take a free slot without queueing - False if none is free or others are waiting"""
+        if self.in_flight < self.capacity and not self._queued():
+            self.in_flight += 1
+            return True
+        return False
+
+    def release(self):
+        """Give back a slot taken with try_acquire"""
+        self._release()
+
+    async def _acquire(self, tenant: str, priority: str, stats: TenantStats, max_wait: float | None):
+        # Fast path - free capacity and nobody waiting
+        if self.in_flight < self.capacity and not self._queued():
+            self.in_flight += 1
+            return 0.0
+
+        # Tag the call with its place in the weighted fair order
+        flow = (tenant, priority)
+        weight = stats.weight * PRIORITY_WEIGHTS[priority]
+        start = max(self.virtual_time, self._flow_finish.get(flow, 0.0))
+        finish = start + self.service_time[priority] / weight
+
+        # Shed now rather than time out later
+        queued = len(self._queued())
+        if queued >= self.max_queue:
+            stats.shed += 1
+            raise Overloaded(f"Upstream queue is full ({queued} waiting)", self.expected_wait())
+        wait = self.expected_wait(finish)
+        if max_wait is not None and wait > max_wait:
+            stats.shed += 1
+            raise Overloaded(
+                f"Expected wait of {wait:.1f}s exceeds the remaining {max_wait:.1f}s", wait
+            )
+
+        self._flow_finish[flow] = finish
+        if len(self._flow_finish) > len(self.tenants) * len(PRIORITY_WEIGHTS):
+            self._prune_flows()
+        self._seq += 1
+        waiter = _Waiter(
+            finish=finish,
+            seq=self._seq,
+            start=start,
+            flow=flow,
+            priority=priority,
+            future=asyncio.get_running_loop().create_future(),
+            enqueued_at=time.monotonic()
+        )
+        heapq.heappush(self._queue, waiter)
+        stats.queued += 1
+
+        try:
+            # Never queue past the caller's deadline
+            await asyncio.wait_for(waiter.future, max_wait)
+        except TimeoutError:
+            stats.queued -= 1
+            stats.shed += 1
+            raise Overloaded(f"No upstream slot within {max_wait:.1f}s", self.expected_wait()) from None
+        except asyncio.CancelledError:
+            stats.queued -= 1
+            if waiter.future.done() and not waiter.future.cancelled():
+                # Slot was granted just as we were cancelled - give it back
+                self._release()
+            raise
+
+        stats.queued -= 1
+        return time.monotonic() - waiter.enqueued_at
+
+    def _release(self):
+        self.in_flight -= 1
+        while self.in_flight < self.capacity and self._queue:
+            waiter = heapq.heappop(self._queue)
+            if waiter.future.done():
+                continue  # Cancelled while queued
+            self.in_flight += 1
+            self.virtual_time = waiter.start
+            waiter.future.set_result(None)
+
+    def stats(self):
+        """Snapshot of capacity and per-tenant queues"""
+        return {
+            "capacity": self.capacity,
+            "in_flight": self.in_flight,
+            "queued": len(self._queued()),
+            "expected_wait_seconds": round(self.expected_wait(), 3),
+            "service_time_seconds": {k: round(v, 3) for k, v in self.service_time.items()},
+            "tenants": {
+                tenant: {
+                    "weight": s.weight,
+                    "queued": s.queued,
+                    "running": s.running,
+                    "admitted": s.admitted,
+                    "shed": s.shed,
+                    "avg_wait_seconds": round(s.total_wait / s.admitted, 3) if s.admitted else 0.0,
+                }
+                for tenant, s in self.tenants.items()
+            },
+        }
+
+
+# Global scheduler instance (one per worker process)
+upstream_scheduler = FairScheduler(
+    capacity=settings.upstream_concurrency,
+    max_queue=settings.scheduler_max_queue,
+    tenant_weights=settings.tenant_weight_map,
+    default_weight=settings.default_tenant_weight,
+    max_tenants=settings.scheduler_max_tenants
+)
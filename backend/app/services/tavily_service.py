@@ -3,20 +3,22 @@ Tavily AI Research Service
 Handles medical research searches
 """
 
-from tavily import TavilyClient
+from tavily import AsyncTavilyClient
 from app.config import settings
+from app.services.deadline import run_stage, DeadlineExceeded
+from app.services.scheduler import Overloaded
 
 
 class TavilyService:
     
     def __init__(self):
        
-        self.client = TavilyClient(api_key=settings.tavily_api_key)
+        self.client = AsyncTavilyClient(api_key=settings.tavily_api_key)
     
-    def search_medical_research(self, query: str, max_results: int = 5):
+    async def search_medical_research(self, query: str, max_results: int = 5, budget_share: float = 1.0):
         try:
-            # Perform search with medical context
-            response = self.client.search(
+            # Perform search with medical context, cancelled if the budget runs out
+            response = await run_stage("tavily.search", lambda: self.client.search(
                 query=f"medical research {query}",
                 search_depth="advanced",
                 max_results=max_results,
@@ -30,10 +32,12 @@ class TavilyService:
                     "healthline.com",
                     "medicalnewstoday.com"
                 ]
-            )
+            ), share=budget_share, hedge=True)
             
             return response
             
+        except (DeadlineExceeded, Overloaded):
+            raise
         except Exception as e:
             raise Exception(f"Research search error: {str(e)}")
     
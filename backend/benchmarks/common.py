@@ -0,0 +1,91 @@
+"""
+Shared helpers for the benchmark suite
+Timing statistics and JSON result files
+"""
+
+# Import libraries
+import json
+import platform
+import subprocess
+import sys
+from datetime import datetime
+from pathlib import Path
+
+RESULTS_DIR = Path(__file__).parent / "results"
+
+
+def percentile(sorted_values: list[float], pct: float):
+    """Linear-interpolated percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    rank = (len(sorted_values) - 1) * pct / 100
+    low = int(rank)
+    high = min(low + 1, len(sorted_values) - 1)
+    return sorted_values[low] + (sorted_values[high] - sorted_values[low]) * (rank - low)
+
+
+def summarize(samples: list[float]):
+    """Summary statistics for a list of timings (seconds)"""
+    ordered = sorted(samples)
+    count = len(ordered)
+    return {
+        "count": count,
+        "min": ordered[0] if ordered else 0.0,
+        "mean": sum(ordered) / count if count else 0.0,
+        "p50": percentile(ordered, 50),
+        "p95": percentile(ordered, 95),
+        "p99": percentile(ordered, 99),
+        "max": ordered[-1] if ordered else 0.0,
+    }
+
+
+def git_revision():
+    """Current commit and whether the tree has local changes"""
+    def run(*args):
+        try:
+            return subprocess.run(
+                ["git", *args], capture_output=True, text=True,
+                cwd=Path(__file__).parent, timeout=10
+            ).stdout.strip()
+        except (OSError, subprocess.SubprocessError):
+            return ""
+
+    return {
+        "commit": run("rev-parse", "--short", "HEAD") or "unknown",
+        "dirty": bool(run("status", "--porcelain", "--untracked-files=no")),
+    }
+
+
+def save_results(kind: str, config: dict, results: dict, output: str = None):
+    """
+    Write a benchmark run to JSON
+
+    Args:
+        kind: Benchmark name (micro, load, ...)
+        config: Parameters used for the run
+        results: Measured numbers
+        output: Optional explicit file path
+
+    Returns:
+        Path of the written file
+    """
+    revision = git_revision()
+    now = datetime.now()
+    payload = {
+        "benchmark": kind,
+        "commit": revision["commit"],
+        "dirty": revision["dirty"],
+        "timestamp": now.isoformat(timespec="seconds"),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "config": config,
+        "results": results,
+    }
+
+    if output:
+        path = Path(output)
+    else:
+        path = RESULTS_DIR / f"{kind}-{revision['commit']}-{now:%Y%m%d-%H%M%S}.json"
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(payload, indent=2))
+    return path
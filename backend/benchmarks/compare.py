@@ -0,0 +1,70 @@
+"""
+Compare two benchmark result files (e.g. before/after a commit)
+
+Usage (from backend/):
+    python -m benchmarks.compare old.json new.json [--threshold 10]
+
+Exits with status 1 when any timing regresses by more than the threshold.
+"""
+
+# Import libraries
+import argparse
+import json
+import sys
+
+# Metrics where a bigger number is better - everything else is "lower is better"
+HIGHER_IS_BETTER = ("throughput_rps",)
+# Memory is compared through traced_peak_kb (per endpoint, --trace-memory);
+# RSS numbers depend on what ran earlier in the process, so they are only reported
+COMPARED = ("p50", "p95", "p99", "mean", "throughput_rps", "traced_peak_kb")
+
+
+def flatten(results: dict, prefix: str = ""):
+    """Turn nested result dictionaries into {"chat.latency.p95": value}"""
+    flat = {}
+    for key, value in results.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            flat.update(flatten(value, f"{name}."))
+        elif isinstance(value, (int, float)) and key in COMPARED:
+            flat[name] = value
+    return flat
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare benchmark results")
+    parser.add_argument("old")
+    parser.add_argument("new")
+    parser.add_argument("--threshold", type=float, default=10.0, help="Regression threshold in percent")
+    args = parser.parse_args()
+
+    with open(args.old) as f:
+        old = json.load(f)
+    with open(args.new) as f:
+        new = json.load(f)
+
+    if old.get("benchmark") != new.get("benchmark"):
+        print(f"Warning: comparing '{old.get('benchmark')}' with '{new.get('benchmark')}'")
+    print(f"{old.get('commit')} -> {new.get('commit')}\n")
+
+    old_flat, new_flat = flatten(old["results"]), flatten(new["results"])
+    regressions = 0
+    for name in sorted(old_flat.keys() & new_flat.keys()):
+        before, after = old_flat[name], new_flat[name]
+        if not before:
+            continue
+        change = (after - before) / before * 100
+        worse = -change if name.endswith(HIGHER_IS_BETTER) else change
+        flag = ""
+        if worse > args.threshold:
+            flag = "  REGRESSION"
+            regressions += 1
+        print(f"{name:50s} {before:14.6g} {after:14.6g} {change:+8.1f}%{flag}")
+
+    if regressions:
+        print(f"\n{regressions} metric(s) regressed by more than {args.threshold}%")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
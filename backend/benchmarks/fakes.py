@@ -0,0 +1,189 @@
+"""
+Local stand-ins for Google Gemini and Tavily
+Lets benchmarks run offline with controlled latency and failures
+"""
+
+# Import libraries
+import asyncio
+import json
+import os
+import random
+import threading
+import time
+from dataclasses import dataclass
+
+# The app reads its API keys at import time - give it dummy ones
+os.environ.setdefault("GOOGLE_API_KEY", "benchmark-fake-key")
+os.environ.setdefault("TAVILY_API_KEY", "benchmark-fake-key")
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from pydantic import PrivateAttr
+
+
+class FakeUpstreamError(Exception):
+    """Raised by the stand-ins when a failure is injected"""
+
+
+@dataclass
+class LatencyProfile:
+    """How a fake upstream behaves"""
+    latency: float = 0.05          # Base seconds before the first token
+    jitter: float = 0.0            # Uniform +/- seconds added to the latency
+    tokens_per_second: float = 0.0 # Output speed, 0 means instant
+    failure_rate: float = 0.0      # Probability (0-1) of raising FakeUpstreamError
+    response_tokens: int = 200     # Approximate size of generated answers
+    tail_rate: float = 0.0         # Probability (0-1) of a straggler call
+    tail_latency: float = 1.0      # Extra seconds a straggler takes
+
+    def sample(self, rng: random.Random):
+        """Return (delay in seconds, should_fail) for one call"""
+        delay = self.latency
+        if self.jitter:
+            delay += rng.uniform(-self.jitter, self.jitter)
+        if self.tail_rate and rng.random() < self.tail_rate:
+            delay += self.tail_latency
+        if self.tokens_per_second:
+            delay += self.response_tokens / self.tokens_per_second
+        return max(delay, 0.0), rng.random() < self.failure_rate
+
+
+class _SeededFake:
+    """Shared random state so a run with the same seed replays the same way"""
+
+    def _init_rng(self, seed: int):
+        self._rng = random.Random(seed)
+        self._rng_lock = threading.Lock()
+        self.calls = 0
+        self.failures = 0
+
+    def _next_call(self, profile: LatencyProfile):
+        with self._rng_lock:
+            self.calls += 1
+            delay, fail = profile.sample(self._rng)
+            if fail:
+                self.failures += 1
+            return delay, fail
+
+
+def _filler(tokens: int):
+    """Deterministic text of roughly `tokens` tokens (about 4 chars each)"""
+    words = ("hemoglobin", "glucose", "within", "normal", "range", "patient",
+             "blood", "pressure", "follow-up", "recommended", "result", "level")
+    return " ".join(words[i % len(words)] for i in range(max(tokens, 1)))
+
+
+def fake_answer(messages, response_tokens: int):
+    """Pick an answer shape that fits what the caller is asking for"""
+    last = messages[-1].content if messages else ""
+    if isinstance(last, list):
+        # Multimodal message -> vision extraction
+        return "PATIENT RECORD\n" + _filler(response_tokens)
+
+    if '"summary"' in last or "key_findings" in last:
+        # Analysis chain expects MedicalAnalysis JSON
+        return json.dumps({
+            "summary": _filler(response_tokens // 4),
+            "key_findings": [_filler(10) for _ in range(4)],
+            "recommendations": [_filler(10) for _ in range(3)],
+            "next_steps": [_filler(8) for _ in range(3)],
+        })
+
+    return _filler(response_tokens)
+
+
+class FakeChatGoogleGenerativeAI(_SeededFake, BaseChatModel):
+    """
+    Drop-in for ChatGoogleGenerativeAI inside LCEL chains
+    Answers chat, analysis (JSON) and vision prompts without the network
+    """
+
+    profile: LatencyProfile = LatencyProfile()
+    seed: int = 0
+
+    _rng: random.Random = PrivateAttr()
+    _rng_lock: threading.Lock = PrivateAttr()
+    calls: int = 0
+    failures: int = 0
+
+    def model_post_init(self, __context):
+        self._init_rng(self.seed)
+
+    @property
+    def _llm_type(self):
+        return "fake-gemini"
+
+    def _result(self, messages, fail):
+        if fail:
+            raise FakeUpstreamError("Injected Gemini failure")
+        text = fake_answer(messages, self.profile.response_tokens)
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=text))])
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        delay, fail = self._next_call(self.profile)
+        time.sleep(delay)
+        return self._result(messages, fail)
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs):
+        delay, fail = self._next_call(self.profile)
+        await asyncio.sleep(delay)
+        return self._result(messages, fail)
+
+
+class FakeTavilyClient(_SeededFake):
+    """Drop-in for AsyncTavilyClient.search"""
+
+    def __init__(self, profile: LatencyProfile = None, seed: int = 0):
+        self.profile = profile or LatencyProfile(latency=0.2)
+        self._init_rng(seed)
+
+    def _response(self, query: str, max_results: int, fail: bool):
+        if fail:
+            raise FakeUpstreamError("Injected Tavily failure")
+        return {
+            "query": query,
+            "results": [
+                {
+                    "title": f"Result {i + 1} for {query}",
+                    "url": f"https://pubmed.ncbi.nlm.nih.gov/{100000 + i}/",
+                    "content": _filler(self.profile.response_tokens),
+                    "score": round(1.0 - i * 0.05, 2),
+                }
+                for i in range(max_results)
+            ],
+        }
+
+    async def search(self, query: str, max_results: int = 5, **kwargs):
+        delay, fail = self._next_call(self.profile)
+        await asyncio.sleep(delay)
+        return self._response(query, max_results, fail)
+
+
+def install_fakes(llm_profile: LatencyProfile = None,
+                  vision_profile: LatencyProfile = None,
+                  search_profile: LatencyProfile = None,
+                  seed: int = 0):
+    """
+    Swap the real upstream clients for stand-ins across the app
+
+    Returns:
+        Dictionary with the installed fakes (useful for call counts)
+    """
+    from app.chains import chat_chain, analysis_chain
+    from app.services.gemini_service import gemini_service
+    from app.services.tavily_service import tavily_service
+
+    llm = FakeChatGoogleGenerativeAI(profile=llm_profile or LatencyProfile(), seed=seed)
+    vision = FakeChatGoogleGenerativeAI(
+        profile=vision_profile or LatencyProfile(latency=0.5, response_tokens=600),
+        seed=seed + 1
+    )
+    search = FakeTavilyClient(profile=search_profile, seed=seed + 2)
+
+    chat_chain.load_google_llm = lambda: llm
+    analysis_chain.load_google_llm = lambda: llm
+    gemini_service.vision_llm = vision
+    tavily_service.client = search
+
+    return {"llm": llm, "vision": vision, "search": search}
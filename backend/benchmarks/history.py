@@ -0,0 +1,196 @@
+"""
+History store benchmarks at scale
+Bulk-loads synthetic analyses, then times paging and full-text queries
+
+Usage (from backend/):
+    python -m benchmarks.history [--rows 1000000] [--patients 20000] [--partition]
+"""
+
+# Import libraries
+import argparse
+import random
+import shutil
+import tempfile
+import time
+from pathlib import Path
+
+import benchmarks.fakes  # noqa: F401 - sets dummy API keys before app imports
+from benchmarks.common import summarize, save_results
+
+# Words that show up in real lab reports, plus a long tail of rarer tokens
+COMMON_WORDS = [
+    "hemoglobin", "glucose", "cholesterol", "creatinine", "malaria", "platelets",
+    "leukocytes", "normal", "elevated", "low", "negative", "positive", "blood",
+    "pressure", "urine", "fasting", "result", "range", "reference", "patient",
+]
+RARE_WORDS = [f"marker{i:05d}" for i in range(20000)]
+
+
+def synthetic_text(rng: random.Random, words: int = 60):
+    parts = []
+    for _ in range(words):
+        if rng.random() < 0.8:
+            parts.append(rng.choice(COMMON_WORDS))
+        else:
+            parts.append(rng.choice(RARE_WORDS))
+        if rng.random() < 0.1:
+            parts.append(f"{rng.uniform(0, 300):.1f}")
+    return " ".join(parts)
+
+
+def populate(store, args, rng: random.Random):
+    """Bulk-load rows through the same write path the background writer uses"""
+    from app.services.history_store import HistoryRecord
+
+    connections = {}
+    start = time.perf_counter()
+    written = 0
+    now = time.time()
+    while written < args.rows:
+        batch = []
+        for i in range(min(args.batch, args.rows - written)):
+            tenant = f"tenant-{rng.randrange(args.tenants)}"
+            text = synthetic_text(rng)
+            batch.append(HistoryRecord(
+                tenant=tenant,
+                patient_id=f"patient-{rng.randrange(args.patients)}",
+                source=rng.choice(("text", "image")),
+                language="en",
+                extracted_text=text,
+                analysis={
+                    "summary": text[:120],
+                    "key_findings": [synthetic_text(rng, 6) for _ in range(3)],
+                    "recommendations": ["Consult your doctor"],
+                    "next_steps": ["Repeat test in 3 months"],
+                },
+                created_at=now - (args.rows - written - i)
+            ))
+        store.write_batch(batch, connections)
+        written += len(batch)
+        if written % (args.batch * 20) == 0 or written == args.rows:
+            print(f"  loaded {written:>10,} rows ({written / (time.perf_counter() - start):,.0f} rows/s)")
+
+    for conn in connections.values():
+        conn.close()
+    elapsed = time.perf_counter() - start
+    size = sum(p.stat().st_size for p in Path(args.dir).rglob("*") if p.is_file())
+    return {"seconds": elapsed, "rows_per_second": args.rows / elapsed, "disk_bytes": size}
+
+
+def time_queries(store, args, rng: random.Random):
+    """Latency of the queries GET /api/history runs"""
+    def pick():
+        return f"tenant-{rng.randrange(args.tenants)}", f"patient-{rng.randrange(args.patients)}"
+
+    def deep_page(tenant, patient):
+        cursor = None
+        for _ in range(3):
+            _, cursor = store.search(tenant, patient, limit=5, cursor=cursor)
+            if cursor is None:
+                break
+
+    cases = {
+        "patient_latest_page": lambda t, p: store.search(t, p, limit=20),
+        "patient_third_page": deep_page,
+        "patient_fts_common": lambda t, p: store.search(t, p, query=rng.choice(COMMON_WORDS)),
+        "patient_fts_rare": lambda t, p: store.search(t, p, query=rng.choice(RARE_WORDS)),
+        "patient_fts_prefix": lambda t, p: store.search(t, p, query="hemo"),
+    }
+    if not args.partition:
+        cases.update({
+            "tenant_latest_page": lambda t, p: store.search(t, limit=20),
+            "tenant_fts_common": lambda t, p: store.search(t, query=rng.choice(COMMON_WORDS)),
+            "tenant_fts_rare": lambda t, p: store.search(t, query=rng.choice(RARE_WORDS)),
+            "tenant_fts_two_words": lambda t, p: store.search(t, query="malaria positive"),
+        })
+
+    results = {}
+    for name, run in cases.items():
+        samples = []
+        for _ in range(args.queries):
+            tenant, patient = pick()
+            start = time.perf_counter()
+            run(tenant, patient)
+            samples.append(time.perf_counter() - start)
+        results[name] = summarize(samples)
+        print(f"  {name:24s} p50={results[name]['p50'] * 1000:7.2f}ms p99={results[name]['p99'] * 1000:7.2f}ms")
+    return results
+
+
+def time_enqueue(store, count: int):
+    """
+    Cost of record() on the request path and how fast the writer drains it
+
+    Raises:
+        SystemExit: if the queue dropped records or the writer didn't finish
+    """
+    samples = []
+    rng = random.Random(count)
+    texts = [synthetic_text(rng) for _ in range(count)]
+    queued_before = store._queued
+    written_before = store._written
+    start = time.perf_counter()
+    for i, text in enumerate(texts):
+        t = time.perf_counter()
+        store.record("tenant-0", f"patient-{i % 100}", "text", "en", text)
+        samples.append(time.perf_counter() - t)
+    store.flush(timeout=120)
+    drain = time.perf_counter() - start
+
+    # Only count rows that really reached the database
+    queued = store._queued - queued_before
+    written = store._written - written_before
+    if queued < count:
+        raise SystemExit(f"History queue dropped {count - queued:,} of {count:,} records - "
+                         f"use --enqueue {store._pending.maxsize:,} or fewer")
+    if written < count:
+        raise SystemExit(f"Writer stored only {written:,} of {count:,} records before the timeout")
+    return {"enqueue": summarize(samples), "drain_rows_per_second": written / drain}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="History store benchmarks")
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--patients", type=int, default=20000)
+    parser.add_argument("--tenants", type=int, default=10)
+    parser.add_argument("--batch", type=int, default=5000, help="Rows per transaction while loading")
+    parser.add_argument("--queries", type=int, default=200, help="Samples per query type")
+    parser.add_argument("--enqueue", type=int, default=10000,
+                        help="Records pushed through the background writer (at most the queue size, 10000)")
+    parser.add_argument("--partition", action="store_true", help="One database per patient")
+    parser.add_argument("--dir", help="Database directory (default: a temporary one)")
+    parser.add_argument("--keep", action="store_true", help="Keep the databases afterwards")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Result file (default: benchmarks/results/)")
+    args = parser.parse_args()
+
+    from app.services.history_store import HistoryStore
+
+    temporary = args.dir is None
+    args.dir = args.dir or tempfile.mkdtemp(prefix="history-bench-")
+    store = HistoryStore(args.dir, args.partition, batch_size=500, flush_interval=0.05)
+    rng = random.Random(args.seed)
+
+    try:
+        if args.enqueue > store._pending.maxsize:
+            parser.error(f"--enqueue must be at most the queue size ({store._pending.maxsize:,})")
+        print(f"Loading {args.rows:,} rows into {args.dir}")
+        results = {"load": populate(store, args, rng)}
+        print("Queries")
+        results["queries"] = time_queries(store, args, rng)
+        print("Background writer")
+        results["writer"] = time_enqueue(store, args.enqueue)
+        store.close()
+        print(f"  record() p50={results['writer']['enqueue']['p50'] * 1e6:.1f}us, "
+              f"drained at {results['writer']['drain_rows_per_second']:,.0f} rows/s")
+    finally:
+        if temporary and not args.keep:
+            shutil.rmtree(args.dir, ignore_errors=True)
+
+    config = {k: v for k, v in vars(args).items() if k not in ("output", "dir", "keep")}
+    path = save_results("history", config, results, args.output)
+    print(f"\nSaved results to {path}")
+
+
+if __name__ == "__main__":
+    main()
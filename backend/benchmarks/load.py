@@ -0,0 +1,214 @@
+"""
+End-to-end load generator for the API endpoints
+Drives the FastAPI app in-process against the local stand-ins
+
+Usage (from backend/):
+    python -m benchmarks.load [--requests 100] [--concurrency 8] [--endpoints chat,research]
+"""
+
+# Import libraries
+import argparse
+import asyncio
+import random
+import resource
+import time
+import tracemalloc
+
+from benchmarks.fakes import install_fakes, LatencyProfile
+from benchmarks.common import summarize, save_results
+
+
+def _image_upload(rng: random.Random, size: int):
+    """Fake JPEG upload (the stand-in vision model never decodes it)"""
+    return {"file": ("record.jpg", b"\xff\xd8\xff\xe0" + rng.randbytes(size), "image/jpeg")}
+
+
+# Endpoint name -> function building the request kwargs
+SCENARIOS = {
+    "chat": lambda rng, args: ("/api/chat", {
+        "json": {"message": "What does a high fasting glucose mean?", "language": "en"}
+    }),
+    "chat-session": lambda rng, args: ("/api/chat", {
+        "json": {
+            "message": "And what should I eat to bring it down?",
+            "language": "en",
+        },
+        # Replaced with the id the server issued for this slot (see run_endpoint)
+        "session_slot": rng.randrange(args.sessions)
+    }),
+    "analyze-text": lambda rng, args: ("/api/analyze-text", {
+        "json": {"text": "Hemoglobin 10.2 g/dL, fasting glucose 7.4 mmol/L", "language": "en"}
+    }),
+    "analyze-image": lambda rng, args: ("/api/analyze-image", {
+        "files": _image_upload(rng, args.image_kb * 1024), "data": {"language": "en"}
+    }),
+    "extract-text": lambda rng, args: ("/api/extract-text", {
+        "files": _image_upload(rng, args.image_kb * 1024)
+    }),
+    # A new query every time so each request reaches Tavily and Gemini (cache misses)
+    "research": lambda rng, args: ("/api/research", {
+        "json": {"query": f"malaria prevention {rng.randrange(10**9)}", "max_results": 10, "language": "en"}
+    }),
+    # The same query every time - measures the research response cache
+    "research-cached": lambda rng, args: ("/api/research", {
+        "json": {"query": "malaria prevention", "max_results": 10, "language": "en"}
+    }),
+}
+
+
+def _rss_kb():
+    """Current resident memory of this process in KB"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * resource.getpagesize() // 1024
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+async def run_endpoint(client, name: str, args):
+    """Fire `args.requests` calls at one endpoint with bounded concurrency"""
+    rng = random.Random(args.seed)
+    requests = [SCENARIOS[name](rng, args) for _ in range(args.requests)]
+    if args.tenants:
+        # Spread requests over several tenants for the fair scheduler
+        for _, kwargs in requests:
+            kwargs["headers"] = {"X-Tenant-ID": f"{name}-tenant-{rng.randrange(args.tenants)}"}
+    latencies, statuses, errors = [], {}, 0
+    sessions = {}  # session slot -> session_id issued by the server
+    queue = iter(requests)
+
+    async def worker():
+        nonlocal errors
+        for path, kwargs in queue:
+            slot = kwargs.pop("session_slot", None)
+            if slot in sessions:
+                kwargs["json"]["session_id"] = sessions[slot]
+            start = time.perf_counter()
+            try:
+                response = await client.post(path, **kwargs)
+                status = str(response.status_code)
+                if slot is not None and response.status_code == 200:
+                    sessions[slot] = response.json()["session_id"]
+            except Exception:
+                status = "exception"
+            latencies.append(time.perf_counter() - start)
+            statuses[status] = statuses.get(status, 0) + 1
+            if status != "200":
+                errors += 1
+
+    if args.trace_memory:
+        tracemalloc.start()
+    rss_start = _rss_kb()
+    wall_start = time.perf_counter()
+
+    await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+
+    wall = time.perf_counter() - wall_start
+    rss_end = _rss_kb()
+    result = {
+        "latency": summarize(latencies),
+        "throughput_rps": len(latencies) / wall if wall else 0.0,
+        "wall_seconds": wall,
+        "errors": errors,
+        "status_codes": statuses,
+        "rss_start_kb": rss_start,
+        "rss_end_kb": rss_end,
+        # Growth during this endpoint only (ru_maxrss is a process-wide peak
+        # that later endpoints inherit, so it isn't reported)
+        "rss_delta_kb": rss_end - rss_start,
+    }
+    if args.trace_memory:
+        result["traced_peak_kb"] = tracemalloc.get_traced_memory()[1] // 1024
+        tracemalloc.stop()
+    return result
+
+
+async def run(args):
+    import httpx
+    from app.main import app
+    from app.services.scheduler import upstream_scheduler
+
+    if args.tenants:
+        # Only tenants named in TENANT_WEIGHTS get their own flow
+        for name in args.endpoints:
+            for i in range(args.tenants):
+                upstream_scheduler.tenant_weights.setdefault(f"{name}-tenant-{i}", upstream_scheduler.default_weight)
+
+    transport = httpx.ASGITransport(app=app)
+    headers = {"X-Request-Timeout": str(args.request_timeout)} if args.request_timeout else {}
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None, headers=headers) as client:
+        if args.mixed:
+            # All endpoints at once, competing for upstream capacity
+            outcomes = await asyncio.gather(*(run_endpoint(client, name, args) for name in args.endpoints))
+            results = dict(zip(args.endpoints, outcomes))
+        else:
+            results = {name: await run_endpoint(client, name, args) for name in args.endpoints}
+
+        for name in args.endpoints:
+            lat = results[name]["latency"]
+            print(
+                f"{name:16s} p50={lat['p50'] * 1000:8.1f}ms p95={lat['p95'] * 1000:8.1f}ms "
+                f"p99={lat['p99'] * 1000:8.1f}ms rps={results[name]['throughput_rps']:7.1f} "
+                f"errors={results[name]['errors']} rss={results[name]['rss_end_kb']}KB "
+                f"({results[name]['rss_delta_kb']:+}KB)"
+            )
+        if args.tenants:
+            results["scheduler"] = (await client.get("/api/scheduler/stats")).json()
+        return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="MediCare AI load generator")
+    parser.add_argument("--requests", type=int, default=100, help="Requests per endpoint")
+    parser.add_argument("--concurrency", type=int, default=8, help="Concurrent clients")
+    parser.add_argument("--endpoints", default=",".join(SCENARIOS), help="Comma-separated endpoint names")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--mixed", action="store_true", help="Run all endpoints concurrently instead of one after another")
+    parser.add_argument("--tenants", type=int, default=0, help="Send X-Tenant-ID from this many tenants per endpoint")
+    parser.add_argument("--sessions", type=int, default=10, help="Concurrent conversations for chat-session")
+    parser.add_argument("--image-kb", type=int, default=512, help="Upload size for image endpoints")
+    parser.add_argument("--llm-latency", type=float, default=0.05)
+    parser.add_argument("--vision-latency", type=float, default=0.5)
+    parser.add_argument("--search-latency", type=float, default=0.2)
+    parser.add_argument("--jitter", type=float, default=0.0, help="Uniform +/- seconds on every upstream call")
+    parser.add_argument("--tokens-per-second", type=float, default=0.0, help="Upstream output speed (0 = instant)")
+    parser.add_argument("--tail-rate", type=float, default=0.0, help="Probability an upstream call straggles")
+    parser.add_argument("--tail-latency", type=float, default=1.0, help="Extra seconds for a straggling call")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="Probability an upstream call fails")
+    parser.add_argument("--request-timeout", type=float, default=0.0, help="Send X-Request-Timeout (seconds) with every request")
+    parser.add_argument("--trace-memory", action="store_true", help="Track Python allocations (slower)")
+    parser.add_argument("--output", help="Result file (default: benchmarks/results/)")
+    args = parser.parse_args()
+    args.endpoints = [e.strip() for e in args.endpoints.split(",") if e.strip()]
+
+    if args.mixed and args.trace_memory:
+        parser.error("--trace-memory measures one endpoint at a time, drop --mixed")
+    unknown = set(args.endpoints) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"Unknown endpoints: {', '.join(sorted(unknown))}")
+
+    def profile(latency):
+        return LatencyProfile(
+            latency=latency,
+            jitter=args.jitter,
+            tokens_per_second=args.tokens_per_second,
+            failure_rate=args.failure_rate,
+            tail_rate=args.tail_rate,
+            tail_latency=args.tail_latency,
+        )
+
+    install_fakes(
+        llm_profile=profile(args.llm_latency),
+        vision_profile=profile(args.vision_latency),
+        search_profile=profile(args.search_latency),
+        seed=args.seed
+    )
+
+    results = asyncio.run(run(args))
+    config = {k: v for k, v in vars(args).items() if k != "output"}
+    path = save_results("load", config, results, args.output)
+    print(f"\nSaved results to {path}")
+
+
+if __name__ == "__main__":
+    main()
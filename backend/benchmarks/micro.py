@@ -0,0 +1,97 @@
+"""
+Microbenchmarks for hot paths that do not need the network
+Chain construction, output parsing and base64 image encoding
+
+Usage (from backend/):
+    python -m benchmarks.micro [--repeat 7] [--output file.json]
+"""
+
+# Import libraries
+import argparse
+import base64
+import json
+import random
+import timeit
+
+from benchmarks.fakes import install_fakes, fake_answer
+from benchmarks.common import summarize, save_results
+
+
+def _sample_analysis_json():
+    """A realistic MedicalAnalysis answer as the LLM would return it"""
+    from langchain_core.messages import HumanMessage
+    return fake_answer([HumanMessage(content='"summary" key_findings')], 200)
+
+
+def build_cases():
+    """Return the list of (name, callable) to time"""
+    from langchain_core.output_parsers import PydanticOutputParser
+    from app.chains.chat_chain import create_chat_chain, create_chat_prompt
+    from app.chains.analysis_chain import create_analysis_chain, create_analysis_prompt
+    from app.models.schemas import MedicalAnalysis
+
+    parser = PydanticOutputParser(pydantic_object=MedicalAnalysis)
+    analysis_json = _sample_analysis_json()
+    fenced_json = f"```json\n{analysis_json}\n```"
+
+    # Images of typical phone-camera sizes
+    rng = random.Random(0)
+    images = {size: rng.randbytes(size) for size in (256 * 1024, 1024 * 1024, 5 * 1024 * 1024)}
+
+    def encode(image_bytes):
+        image_b64 = base64.b64encode(image_bytes).decode('utf-8')
+        return f"data:image/jpeg;base64,{image_b64}"
+
+    cases = [
+        # __wrapped__ bypasses the per-language cache to time real construction
+        ("chain.create_chat_prompt.en", lambda: create_chat_prompt.__wrapped__("en")),
+        ("chain.create_analysis_prompt.en", lambda: create_analysis_prompt.__wrapped__("en")),
+        # A chain around an already built prompt - what a forked worker pays
+        ("chain.create_chat_chain.en", lambda: create_chat_chain.__wrapped__("en")),
+        ("chain.create_chat_chain.fr", lambda: create_chat_chain.__wrapped__("fr")),
+        ("chain.create_analysis_chain.en", lambda: create_analysis_chain.__wrapped__("en")),
+        ("chain.create_analysis_chain.fr", lambda: create_analysis_chain.__wrapped__("fr")),
+        ("chain.create_analysis_chain.cached", lambda: create_analysis_chain("en")),
+        ("parse.format_instructions", parser.get_format_instructions),
+        ("parse.medical_analysis", lambda: parser.parse(analysis_json)),
+        ("parse.medical_analysis_fenced", lambda: parser.parse(fenced_json)),
+        ("parse.json_loads", lambda: json.loads(analysis_json)),
+    ]
+    for size, image_bytes in images.items():
+        cases.append((f"base64.data_url.{size // 1024}kb", lambda b=image_bytes: encode(b)))
+
+    return cases
+
+
+def run_case(func, repeat: int):
+    """Time one callable, returning per-call statistics in seconds"""
+    timer = timeit.Timer(func)
+    number, _ = timer.autorange()
+    rounds = timer.repeat(repeat=repeat, number=number)
+    stats = summarize([r / number for r in rounds])
+    stats["loops_per_round"] = number
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="MediCare AI microbenchmarks")
+    parser.add_argument("--repeat", type=int, default=7, help="Timing rounds per case")
+    parser.add_argument("--filter", default="", help="Only run cases containing this text")
+    parser.add_argument("--output", help="Result file (default: benchmarks/results/)")
+    args = parser.parse_args()
+
+    install_fakes()
+
+    results = {}
+    for name, func in build_cases():
+        if args.filter not in name:
+            continue
+        results[name] = run_case(func, args.repeat)
+        print(f"{name:40s} {results[name]['p50'] * 1e6:12.1f} us/call")
+
+    path = save_results("micro", {"repeat": args.repeat, "filter": args.filter}, results, args.output)
+    print(f"\nSaved results to {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,185 @@
+"""
+Serialization and compression benchmarks for large responses
+Compares FastAPI's default JSON path with app.responses, both as raw
+serializers and through a real route (response_model validation included)
+
+Usage (from backend/):
+    python -m benchmarks.serialization [--pages 20] [--repeat 7] [--output file.json]
+"""
+
+# Import libraries
+import argparse
+import asyncio
+import gzip
+import json
+import time
+import timeit
+from datetime import datetime
+
+import benchmarks.fakes  # noqa: F401 - sets dummy API keys before app imports
+from benchmarks.common import summarize, save_results
+
+
+def build_payloads(pages: int):
+    """Realistic large responses: multi-page OCR output and a 10-result search"""
+    from benchmarks.fakes import fake_answer
+    from langchain_core.messages import HumanMessage
+    from app.models.schemas import (
+        AnalysisResponse, ImageAnalysisResponse, ResearchResponse, ResearchResult
+    )
+
+    page = fake_answer([HumanMessage(content=[])], 600)
+    analysis = json.loads(fake_answer([HumanMessage(content="key_findings")], 200))
+    image = ImageAnalysisResponse(
+        extracted_text="\n\n".join(f"--- Page {i + 1} ---\n{page}" for i in range(pages)),
+        analysis=AnalysisResponse(
+            **analysis,
+            disclaimer="This analysis is for informational purposes only.",
+            language="en",
+            timestamp=datetime.now()
+        )
+    )
+    research = ResearchResponse(
+        query="malaria prevention",
+        results=[
+            ResearchResult(
+                title=f"Result {i + 1}",
+                url=f"https://pubmed.ncbi.nlm.nih.gov/{100000 + i}/",
+                content=fake_answer([HumanMessage(content="x")], 125),
+                score=1.0 - i * 0.05
+            )
+            for i in range(10)
+        ],
+        summary=fake_answer([HumanMessage(content="x")], 80),
+        timestamp=datetime.now()
+    )
+    return {"image_analysis": image, "research": research}
+
+
+def time_call(func, repeat: int):
+    timer = timeit.Timer(func)
+    number, _ = timer.autorange()
+    return summarize([r / number for r in timer.repeat(repeat=repeat, number=number)])
+
+
+def build_route_app(models: dict, response_class=None):
+    """Tiny app serving each payload from a response_model route, like the real endpoints"""
+    from fastapi import FastAPI
+
+    app = FastAPI()
+    for name, model in models.items():
+        kwargs = {"response_model": type(model)}
+        if response_class is not None:
+            kwargs["response_class"] = response_class
+        app.add_api_route(f"/{name}", lambda model=model: model, methods=["GET"], **kwargs)
+    return app
+
+
+def time_route(app, path: str, repeat: int):
+    """Seconds per request for one ASGI call (no network, no middleware)"""
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1",
+        "method": "GET", "scheme": "http", "path": path, "raw_path": path.encode(),
+        "query_string": b"", "root_path": "", "headers": [(b"host", b"bench")],
+        "server": ("bench", 80), "client": ("127.0.0.1", 50000),
+    }
+    statuses = []
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            statuses.append(message["status"])
+
+    async def batch(number: int):
+        start = time.perf_counter()
+        for _ in range(number):
+            await app(dict(scope), receive, send)
+        return time.perf_counter() - start
+
+    loop = asyncio.new_event_loop()
+    try:
+        first = loop.run_until_complete(batch(1))
+        if statuses[0] != 200:
+            raise RuntimeError(f"{path} returned {statuses[0]}")
+        # Batches of roughly 0.2s, like timeit's autorange
+        number = max(1, int(0.2 / max(first, 1e-6)))
+        samples = [loop.run_until_complete(batch(number)) / number for _ in range(repeat)]
+    finally:
+        loop.close()
+    return summarize(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Response serialization benchmarks")
+    parser.add_argument("--pages", type=int, default=20, help="Pages of OCR text in the image payload")
+    parser.add_argument("--repeat", type=int, default=7)
+    parser.add_argument("--output", help="Result file (default: benchmarks/results/)")
+    args = parser.parse_args()
+
+    from fastapi.encoders import jsonable_encoder
+    from app import responses
+    from app.config import settings
+
+    def fastapi_default(model):
+        # Classic JSONResponse path: jsonable_encoder, then json.dumps
+        return json.dumps(
+            jsonable_encoder(model), ensure_ascii=False, allow_nan=False,
+            indent=None, separators=(",", ":")
+        ).encode("utf-8")
+
+    serializers = {
+        "fastapi_default": fastapi_default,
+        "pydantic_dump_json": lambda model: model.model_dump_json().encode("utf-8"),
+        "app_dump_json": responses.dump_json,
+    }
+
+    payloads = build_payloads(args.pages)
+    # The whole response path: validation, serialization and the response class
+    route_apps = {
+        "route_default": build_route_app(payloads),
+        "route_fast_json": build_route_app(payloads, responses.FastJSONResponse),
+    }
+
+    results = {}
+    for name, model in payloads.items():
+        body = responses.dump_json(model)
+        entry = {"serialize": {}, "route": {}, "bytes": {"identity": len(body)}, "compress": {}}
+
+        for label, serializer in serializers.items():
+            entry["serialize"][label] = time_call(lambda: serializer(model), args.repeat)
+        for label, route_app in route_apps.items():
+            entry["route"][label] = time_route(route_app, f"/{name}", args.repeat)
+
+        entry["bytes"]["gzip"] = len(gzip.compress(body, compresslevel=settings.gzip_level))
+        entry["compress"]["gzip"] = time_call(
+            lambda: gzip.compress(body, compresslevel=settings.gzip_level), args.repeat
+        )
+        if responses.brotli is not None:
+            entry["bytes"]["br"] = len(responses.compress(body, "br"))
+            entry["compress"]["br"] = time_call(lambda: responses.compress(body, "br"), args.repeat)
+
+        results[name] = entry
+        print(f"\n{name} ({entry['bytes']['identity']} bytes)")
+        for label, stats in entry["serialize"].items():
+            print(f"  serialize {label:20s} {stats['p50'] * 1e6:10.1f} us")
+        for label, stats in entry["route"].items():
+            print(f"  route     {label:20s} {stats['p50'] * 1e6:10.1f} us")
+        for label, stats in entry["compress"].items():
+            print(f"  compress  {label:20s} {stats['p50'] * 1e6:10.1f} us -> {entry['bytes'][label]} bytes")
+
+    config = {
+        "pages": args.pages,
+        "repeat": args.repeat,
+        "orjson": responses.orjson is not None,
+        "brotli": responses.brotli is not None,
+        "gzip_level": settings.gzip_level,
+        "brotli_quality": settings.brotli_quality,
+    }
+    path = save_results("serialization", config, results, args.output)
+    print(f"\nSaved results to {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,16 @@
+"""
+Shared test setup
+Dummy API keys are set before anything imports app.config
+"""
+
+# Import libraries
+import asyncio
+import pytest
+
+import benchmarks.fakes  # noqa: F401 - sets dummy API keys before app imports
+
+
+@pytest.fixture
+def run():
+    """Run a coroutine to completion on a fresh event loop"""
+    return asyncio.run
@@ -0,0 +1,186 @@
+"""
+Tests for the bounded chat memory (app/services/chat_memory.py)
+"""
+
+import threading
+import pytest
+from langchain_core.messages import HumanMessage, AIMessage
+from app.services.chat_memory import (
+    ChatMemory, ChatSession, InMemoryChatHistoryStore, SQLiteChatHistoryStore, estimate_tokens
+)
+
+
+def make_memory(max_turns=3, token_budget=400):
+    return ChatMemory(InMemoryChatHistoryStore(ttl=3600), max_turns=max_turns, token_budget=token_budget)
+
+
+def history_tokens(memory, session_id):
+    summary, messages = memory.load(session_id)
+    return estimate_tokens(summary) + sum(estimate_tokens(m.content) for m in messages)
+
+
+def test_unknown_session_loads_empty():
+    memory = make_memory()
+    assert memory.load("missing") == ("", [])
+
+
+def test_turns_come_back_as_alternating_messages():
+    memory = make_memory()
+    memory.record_turn("s1", "What is malaria?", "A parasite infection.")
+    summary, messages = memory.load("s1")
+
+    assert summary == ""
+    assert [type(m) for m in messages] == [HumanMessage, AIMessage]
+    assert messages[1].content == "A parasite infection."
+
+
+def test_old_turns_move_into_summary():
+    memory = make_memory(max_turns=3, token_budget=10000)
+    for i in range(5):
+        memory.record_turn("s1", f"question {i}", f"answer {i}")
+    summary, messages = memory.load("s1")
+
+    assert [m.content for m in messages[::2]] == ["question 2", "question 3", "question 4"]
+    assert "question 0" in summary and "question 1" in summary
+
+
+def test_short_turn_is_kept_verbatim():
+    memory = make_memory()
+    memory.record_turn("s1", "Line one\n\nLine two", "Answer\n- item")
+    _, messages = memory.load("s1")
+    assert messages[0].content == "Line one\n\nLine two"
+    assert messages[1].content == "Answer\n- item"
+
+
+def test_single_long_turn_is_clipped_to_budget():
+    memory = make_memory(token_budget=1500)
+    long_answer = "word " * 8000  # far more than a 2048-token Gemini answer
+    for _ in range(4):
+        memory.record_turn("s1", "question " * 50, long_answer)
+        assert history_tokens(memory, "s1") <= 1500
+
+    _, messages = memory.load("s1")
+    assert messages[0].content.startswith("question")
+    assert messages[1].content.endswith("...")
+
+
+def test_long_question_leaves_room_for_the_answer():
+    memory = make_memory(token_budget=400)
+    memory.record_turn("s1", "question " * 1000, "short answer")
+    _, messages = memory.load("s1")
+
+    assert messages[1].content == "short answer"
+    assert history_tokens(memory, "s1") <= 400
+
+
+def test_summary_stays_within_its_budget():
+    memory = make_memory(max_turns=1, token_budget=400)
+    for i in range(50):
+        memory.record_turn("s1", f"question number {i} " * 10, f"answer number {i} " * 10)
+    summary, _ = memory.load("s1")
+
+    assert estimate_tokens(summary) <= memory.summary_budget
+    assert "question number 49" not in summary  # newest turn is verbatim, not summarized
+    assert "question number 48" in summary
+
+
+def test_resolve_session_only_keeps_live_server_ids():
+    memory = make_memory()
+    issued = memory.resolve_session(None)
+    assert len(issued) >= 32
+
+    # A made-up id never becomes a session
+    assert memory.resolve_session("1") != "1"
+
+    memory.record_turn(issued, "hello", "hi")
+    assert memory.resolve_session(issued) == issued
+
+
+def test_in_memory_store_expires_and_caps_sessions():
+    store = InMemoryChatHistoryStore(ttl=3600, max_sessions=2)
+    for session_id in ("a", "b", "c"):
+        store.save(session_id, ChatSession())
+    assert store.get("a") is None
+    assert store.get("c") is not None
+
+    store.ttl = -1
+    assert store.get("c") is None
+
+
+def test_sqlite_store_round_trip(tmp_path):
+    store = SQLiteChatHistoryStore(str(tmp_path / "chat.db"), ttl=3600)
+    store.save("s1", ChatSession(summary="- earlier", turns=[("q", "a")]))
+
+    session = store.get("s1")
+    assert session.summary == "- earlier"
+    assert session.turns == [("q", "a")]
+
+    store.ttl = -1
+    assert store.get("s1") is None
+    assert store.evict_expired() == 1
+
+
+def test_sqlite_store_opens_lazily_and_reopens_after_fork(tmp_path):
+    store = SQLiteChatHistoryStore(str(tmp_path / "chat.db"), ttl=3600)
+    assert store._conn is None
+
+    store.save("s1", ChatSession(summary="x"))
+    parent_conn = store._conn
+
+    # Pretend we are a forked child: a new connection, the inherited one left alone
+    store._pid = -1
+    assert store.get("s1").summary == "x"
+    assert store._conn is not parent_conn
+    assert store._inherited == [parent_conn]
+
+
+@pytest.mark.parametrize("text", ["", "a", "abcd" * 100])
+def test_estimate_tokens_is_positive(text):
+    assert estimate_tokens(text) >= 1
+
+
+def test_sqlite_turns_from_two_workers_are_never_lost(tmp_path):
+    path = str(tmp_path / "chat.db")
+    # Two stores on one file behave like two worker processes
+    workers = [
+        ChatMemory(SQLiteChatHistoryStore(path, ttl=3600), max_turns=100, token_budget=100000)
+        for _ in range(2)
+    ]
+
+    def chat(memory, name):
+        for i in range(25):
+            memory.record_turn("shared", f"{name} {i}", "ok")
+
+    threads = [threading.Thread(target=chat, args=(memory, f"w{n}")) for n, memory in enumerate(workers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    _, messages = workers[0].load("shared")
+    assert len(messages) == 100
+
+
+def test_async_methods_run_sqlite_off_the_event_loop(tmp_path, run, monkeypatch):
+    memory = ChatMemory(SQLiteChatHistoryStore(str(tmp_path / "chat.db"), ttl=3600), max_turns=3, token_budget=400)
+    threads = []
+    original = memory.record_turn
+    monkeypatch.setattr(memory, "record_turn", lambda *args: (threads.append(threading.get_ident()), original(*args)))
+
+    async def scenario():
+        session_id = await memory.aresolve_session(None)
+        await memory.arecord_turn(session_id, "hello", "hi")
+        return session_id, await memory.aload(session_id)
+
+    session_id, (_, messages) = run(scenario())
+    assert [m.content for m in messages] == ["hello", "hi"]
+    assert threads and threads[0] != threading.get_ident()
+
+
+def test_unknown_chat_backend_fails_at_startup(monkeypatch):
+    from pydantic import ValidationError
+    from app.config import Settings
+
+    monkeypatch.setenv("CHAT_HISTORY_BACKEND", "sqllite")
+    with pytest.raises(ValidationError):
+        Settings()
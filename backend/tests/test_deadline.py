@@ -0,0 +1,207 @@
+"""
+Tests for request deadlines and hedged upstream calls (app/services/deadline.py)
+"""
+
+import asyncio
+import pytest
+from app.config import settings
+from app.services import deadline
+from app.services.deadline import (
+    DeadlineExceeded, HedgeBudget, LatencyTracker,
+    start_deadline, end_deadline, parse_timeout_header, run_stage
+)
+from app.services.scheduler import upstream_scheduler
+
+
+@pytest.fixture(autouse=True)
+def fresh_stage_state(monkeypatch):
+    """Each test gets empty latency history, a full hedge budget and an idle scheduler"""
+    monkeypatch.setattr(deadline, "latency_trackers", {})
+    monkeypatch.setattr(deadline, "hedge_budget", HedgeBudget(ratio=1.0))
+    monkeypatch.setattr(settings, "hedge_enabled", True)
+    monkeypatch.setattr(settings, "hedge_min_samples", 5)
+    yield
+    assert upstream_scheduler.in_flight == 0
+
+
+def prime(stage: str, seconds: float, samples: int = 20):
+    """Pretend a stage has recently taken `seconds`"""
+    tracker = deadline.latency_trackers.setdefault(stage, LatencyTracker())
+    for _ in range(samples):
+        tracker.record(seconds)
+
+
+def with_deadline(timeout: float, coro_fn):
+    async def runner():
+        token = start_deadline(timeout)
+        try:
+            return await coro_fn()
+        finally:
+            end_deadline(token)
+    return runner
+
+
+@pytest.mark.parametrize("value, expected", [
+    (None, 30.0),
+    ("", 30.0),
+    ("abc", 30.0),
+    ("-5", 30.0),
+    ("2.5", 2.5),
+    ("9999", 120.0),
+])
+def test_parse_timeout_header(value, expected, monkeypatch):
+    monkeypatch.setattr(settings, "request_timeout", 30.0)
+    monkeypatch.setattr(settings, "max_request_timeout", 120.0)
+    assert parse_timeout_header(value) == expected
+
+
+def test_run_stage_without_deadline(run):
+    async def call():
+        return "ok"
+    assert run(run_stage("test.plain", call)) == "ok"
+    assert len(deadline.latency_trackers["test.plain"].samples) == 1
+
+
+def test_run_stage_cancels_call_past_its_share(run):
+    cancelled = asyncio.Event()
+
+    async def slow():
+        try:
+            await asyncio.sleep(5)
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+
+    async def scenario():
+        with pytest.raises(DeadlineExceeded):
+            await run_stage("test.slow", slow, share=0.5)
+        return cancelled.is_set()
+
+    assert run(with_deadline(0.2, scenario)()) is True
+
+
+def test_run_stage_with_expired_deadline_never_calls(run):
+    calls = []
+
+    async def call():
+        calls.append(1)
+
+    async def scenario():
+        await asyncio.sleep(0.02)
+        with pytest.raises(DeadlineExceeded):
+            await run_stage("test.expired", call)
+
+    run(with_deadline(0.01, scenario)())
+    assert calls == []
+
+
+def test_slow_call_is_hedged_and_fast_duplicate_wins(run):
+    prime("test.hedge", 0.01)
+    delays = iter([1.0, 0.0])
+    started = []
+
+    async def call():
+        delay = next(delays)
+        started.append(delay)
+        await asyncio.sleep(delay)
+        return delay
+
+    async def scenario():
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        result = await run_stage("test.hedge", call, hedge=True)
+        return result, loop.time() - start
+
+    result, elapsed = run(scenario())
+    assert result == 0.0
+    assert started == [1.0, 0.0]
+    assert elapsed < 0.5
+    assert deadline.hedge_budget.hedges == 1
+    # The race time says nothing about the original call - it is not recorded
+    assert len(deadline.latency_trackers["test.hedge"].samples) == 20
+
+
+def test_primary_latency_is_recorded_when_hedge_loses(run):
+    prime("test.hedge_loses", 0.01)
+    delays = iter([0.05, 1.0])
+
+    async def call():
+        delay = next(delays)
+        await asyncio.sleep(delay)
+        return delay
+
+    assert run(run_stage("test.hedge_loses", call, hedge=True)) == 0.05
+    assert deadline.hedge_budget.hedges == 1
+    samples = deadline.latency_trackers["test.hedge_loses"].samples
+    assert len(samples) == 21 and samples[-1] >= 0.05
+
+
+def test_no_hedge_before_enough_samples(run):
+    prime("test.cold", 0.01, samples=2)
+    calls = []
+
+    async def call():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return "done"
+
+    assert run(run_stage("test.cold", call, hedge=True)) == "done"
+    assert len(calls) == 1
+
+
+def test_no_hedge_without_budget(run, monkeypatch):
+    monkeypatch.setattr(deadline, "hedge_budget", HedgeBudget(ratio=0.0))
+    prime("test.budget", 0.01)
+    calls = []
+
+    async def call():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+
+    run(run_stage("test.budget", call, hedge=True))
+    assert len(calls) == 1
+
+
+def test_hedge_needs_a_free_scheduler_slot(run, monkeypatch):
+    # The original call holds the only slot, so there is none for a duplicate
+    monkeypatch.setattr(upstream_scheduler, "capacity", 1)
+    prime("test.full", 0.01)
+    calls = []
+
+    async def call():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+
+    run(run_stage("test.full", call, hedge=True))
+    assert len(calls) == 1
+    assert deadline.hedge_budget.hedges == 0
+
+
+def test_hedge_holds_its_own_slot_while_running(run):
+    prime("test.slots", 0.01)
+    in_flight = []
+
+    async def call():
+        in_flight.append(upstream_scheduler.in_flight)
+        await asyncio.sleep(0.1)
+
+    run(run_stage("test.slots", call, hedge=True))
+    # Original took one slot, the duplicate a second one
+    assert in_flight == [1, 2]
+
+
+def test_hedge_budget_limits_extra_calls():
+    budget = HedgeBudget(ratio=0.1, burst=10)
+    allowed = 0
+    for _ in range(100):
+        budget.earn()
+        allowed += budget.try_spend()
+    assert 9 <= allowed <= 10  # ~10%, give or take float rounding
+
+
+def test_latency_tracker_percentile():
+    tracker = LatencyTracker()
+    for ms in range(1, 101):
+        tracker.record(ms / 1000)
+    assert tracker.percentile(50) == pytest.approx(0.051)
+    assert tracker.percentile(95) == pytest.approx(0.096)
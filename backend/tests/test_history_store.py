@@ -0,0 +1,217 @@
+"""
+Tests for the analysis history store (app/services/history_store.py)
+and the access rules of GET /api/history
+"""
+
+import time
+import pytest
+from fastapi.testclient import TestClient
+from app.config import settings
+from app.services.history_store import HistoryRecord, HistoryStore, fts_query
+
+
+def make_record(tenant="key-a", patient_id="p1", text="hemoglobin normal", analysis=None, created_at=None):
+    return HistoryRecord(
+        tenant=tenant,
+        patient_id=patient_id,
+        source="text",
+        language="en",
+        extracted_text=text,
+        analysis=analysis,
+        created_at=created_at or time.time()
+    )
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = HistoryStore(tmp_path, partition_by_patient=False, batch_size=50, flush_interval=0.01)
+    yield store
+    store.close()
+
+
+def all_pages(store, tenant, patient_id=None, query=None, limit=3):
+    """Follow next_cursor until the end"""
+    items, cursor = store.search(tenant, patient_id, query, limit=limit)
+    pages = [items]
+    while cursor is not None:
+        items, cursor = store.search(tenant, patient_id, query, limit=limit, cursor=cursor)
+        pages.append(items)
+    return pages
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("malaria", '"malaria"*'),
+    ("malaria positive", '"malaria" "positive"*'),
+    ('"; DROP TABLE analyses; --', '"DROP" "TABLE" "analyses"*'),
+    ("*()", None),
+])
+def test_fts_query_quotes_every_word(text, expected):
+    assert fts_query(text) == expected
+
+
+def test_missing_database_is_empty(store):
+    assert store.search("key-a") == ([], None)
+
+
+def test_cursor_pages_cover_everything_newest_first(store):
+    store.write_batch([make_record(text=f"report {i}", created_at=1000 + i) for i in range(10)])
+
+    pages = all_pages(store, "key-a", "p1", limit=3)
+    texts = [item["extracted_text"] for page in pages for item in page]
+
+    assert [len(page) for page in pages] == [3, 3, 3, 1]
+    assert texts == [f"report {i}" for i in range(9, -1, -1)]
+
+
+def test_full_text_pages_use_the_same_cursor(store):
+    store.write_batch([
+        make_record(text=f"malaria test {i}" if i % 2 else f"glucose test {i}") for i in range(10)
+    ])
+
+    pages = all_pages(store, "key-a", "p1", query="malaria", limit=2)
+    texts = [item["extracted_text"] for page in pages for item in page]
+
+    assert texts == [f"malaria test {i}" for i in (9, 7, 5, 3, 1)]
+
+
+def test_search_stays_inside_tenant_and_patient(store):
+    store.write_batch([
+        make_record("key-a", "p1", "malaria positive"),
+        make_record("key-a", "p2", "malaria negative"),
+        make_record("key-b", "p1", "malaria positive"),
+    ])
+
+    assert [r["patient_id"] for r in store.search("key-a", "p1", "malaria")[0]] == ["p1"]
+    assert len(store.search("key-a", query="malaria")[0]) == 2
+    assert len(store.search("key-a")[0]) == 2
+    assert len(store.search("key-b", "p2", "malaria")[0]) == 0
+    assert len(store.search("key-c", query="malaria")[0]) == 0
+
+
+def test_results_hide_internal_columns(store):
+    store.write_batch([make_record(analysis={"summary": "Mild anaemia", "key_findings": ["low iron"]})])
+    item = store.search("key-a", "p1")[0][0]
+
+    assert item["analysis"]["summary"] == "Mild anaemia"
+    assert {"tenant", "scope", "findings"}.isdisjoint(item)
+
+
+def test_findings_are_searchable_with_snippet(store):
+    store.write_batch([make_record(
+        text="Hémoglobine 10.2 g/dL",
+        analysis={"summary": "Mild anaemia", "key_findings": ["iron deficiency likely"]}
+    )])
+
+    assert len(store.search("key-a", "p1", "deficiency")[0]) == 1
+    # Diacritics are folded and the last word is a prefix
+    item = store.search("key-a", "p1", "hemoglob")[0][0]
+    assert "[Hémoglobine]" in item["snippet"]
+
+
+def test_malformed_query_returns_nothing(store):
+    store.write_batch([make_record()])
+    assert store.search("key-a", "p1", '"(*') == ([], None)
+
+
+def test_background_writer_flushes_batches(store):
+    for i in range(120):
+        store.record("key-a", "p1", "text", "en", f"queued record {i}")
+    store.flush(timeout=5)
+
+    assert store._written == 120
+    items, _ = store.search("key-a", "p1", limit=100)
+    assert items[0]["extracted_text"] == "queued record 119"
+
+
+def test_writer_survives_os_errors(tmp_path, caplog):
+    blocked = tmp_path / "not-a-directory"
+    blocked.write_text("")
+    store = HistoryStore(blocked, partition_by_patient=True, batch_size=10, flush_interval=0.01)
+    try:
+        store.record("key-a", "p1", "text", "en", "lost")
+        store.flush(timeout=5)
+        store.record("key-a", "p1", "text", "en", "also lost")
+        store.flush(timeout=5)
+
+        assert store._written == 2
+        assert store._writer.is_alive()
+        assert "Failed to write" in caplog.text
+    finally:
+        store.close()
+
+
+def test_partitioned_store_uses_one_file_per_patient(tmp_path):
+    store = HistoryStore(tmp_path, partition_by_patient=True, batch_size=10, flush_interval=0.01)
+    try:
+        store.write_batch([make_record(patient_id="p1"), make_record(patient_id="p2")])
+        assert store.db_path("key-a", "p1") != store.db_path("key-a", "p2")
+        assert len(list(tmp_path.rglob("*.db"))) == 2
+        assert len(store.search("key-a", "p1")[0]) == 1
+
+        # Without a patient it could never be read back, so it is not stored
+        store.record("key-a", None, "text", "en", "orphan")
+        assert store._queued == 0
+    finally:
+        store.close()
+
+
+# ---------- GET /api/history access rules ----------
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    from benchmarks.fakes import install_fakes, LatencyProfile
+    from app.chains.analysis_chain import create_analysis_chain
+    from app.main import app
+    from app.routes import analysis, history
+
+    install_fakes(llm_profile=LatencyProfile(latency=0.0))
+    create_analysis_chain.cache_clear()
+    store = HistoryStore(tmp_path, partition_by_patient=False, batch_size=10, flush_interval=0.01)
+    monkeypatch.setattr(settings, "history_enabled", True)
+    monkeypatch.setattr(settings, "api_keys", "key-one,key-two")
+    monkeypatch.setattr(analysis, "history_store", store)
+    monkeypatch.setattr(history, "history_store", store)
+
+    with TestClient(app) as test_client:
+        test_client.store = store
+        yield test_client
+    store.close()
+    create_analysis_chain.cache_clear()
+
+
+def analyze(client, headers=None, patient_id="p1"):
+    body = {"text": "Hemoglobin 10.2 g/dL", "patient_id": patient_id}
+    return client.post("/api/analyze-text", json=body, headers=headers or {})
+
+
+def test_history_disabled_by_default():
+    assert type(settings).model_fields["history_enabled"].default is False
+
+
+def test_history_requires_a_valid_api_key(client):
+    assert client.get("/api/history").status_code == 401
+    assert client.get("/api/history", headers={"X-Tenant-ID": "anonymous"}).status_code == 401
+    assert client.get("/api/history", headers={"X-API-Key": "guess"}).status_code == 403
+
+
+def test_filing_under_a_patient_requires_a_valid_api_key(client):
+    assert analyze(client).status_code == 401
+    assert analyze(client, {"X-API-Key": "guess"}).status_code == 403
+
+
+def test_anonymous_analysis_is_not_stored(client):
+    assert analyze(client, patient_id=None).status_code == 200
+    client.store.flush(timeout=5)
+    assert client.store._queued == 0
+
+
+def test_history_is_private_to_each_key(client):
+    assert analyze(client, {"X-API-Key": "key-one", "X-Tenant-ID": "shared"}).status_code == 200
+    client.store.flush(timeout=5)
+
+    own = client.get("/api/history", headers={"X-API-Key": "key-one"}).json()
+    other = client.get("/api/history", headers={"X-API-Key": "key-two", "X-Tenant-ID": "shared"}).json()
+
+    assert [item["patient_id"] for item in own["items"]] == ["p1"]
+    assert own["items"][0]["analysis"] is not None
+    assert other["items"] == []
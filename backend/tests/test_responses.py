@@ -0,0 +1,168 @@
+"""
+Tests for the response layer (app/responses.py)
+"""
+
+import gzip
+import pytest
+from fastapi import FastAPI
+from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse, Response, StreamingResponse
+from fastapi.testclient import TestClient
+from starlette.requests import Request
+from app import responses
+from app.responses import CompressionMiddleware, choose_encoding, etag_matches, make_etag
+
+BIG = "x" * 2000
+
+
+def make_request(if_none_match=None):
+    headers = [] if if_none_match is None else [(b"if-none-match", if_none_match.encode())]
+    return Request({"type": "http", "method": "GET", "path": "/", "headers": headers})
+
+
+def make_client():
+    app = FastAPI()
+
+    @app.get("/big")
+    def big():
+        return {"text": BIG}
+
+    @app.get("/small")
+    def small():
+        return {"text": "hi"}
+
+    @app.get("/stream")
+    def stream():
+        return StreamingResponse(iter([BIG.encode(), BIG.encode()]), media_type="application/json")
+
+    @app.get("/encoded")
+    def encoded():
+        return Response(gzip.compress(BIG.encode()), media_type="application/json",
+                        headers={"Content-Encoding": "gzip"})
+
+    @app.get("/binary")
+    def binary():
+        return Response(BIG.encode(), media_type="image/png")
+
+    @app.get("/text")
+    def text():
+        return PlainTextResponse(BIG)
+
+    app.add_middleware(CORSMiddleware, allow_origins=["https://clinic.example"])
+    app.add_middleware(CompressionMiddleware, minimum_size=1024)
+    return TestClient(app)
+
+
+def get(client, path, accept="gzip", **headers):
+    return client.get(path, headers={"Accept-Encoding": accept, **headers})
+
+
+def vary(response):
+    return sorted(part.strip().lower() for part in response.headers.get("vary", "").split(",") if part.strip())
+
+
+def test_choose_encoding_prefers_brotli():
+    assert choose_encoding("gzip, br") == "br"
+    assert choose_encoding("gzip") == "gzip"
+    assert choose_encoding("*") == "br"
+
+
+def test_choose_encoding_q_values():
+    assert choose_encoding("br;q=0.5, gzip;q=0.8") == "gzip"
+    assert choose_encoding("br;q=0, gzip") == "gzip"
+    assert choose_encoding("gzip;q=0") is None
+    assert choose_encoding("gzip;q=oops") is None
+    assert choose_encoding("*;q=0.1, br;q=0") == "gzip"
+
+
+def test_choose_encoding_identity_only():
+    assert choose_encoding("identity") is None
+    assert choose_encoding("identity, *;q=0") is None
+
+
+def test_choose_encoding_without_brotli(monkeypatch):
+    monkeypatch.setattr(responses, "brotli", None)
+    assert choose_encoding("br, gzip;q=0.5") == "gzip"
+    assert choose_encoding("br") is None
+
+
+def test_etag_matches():
+    etag = make_etag(b'{"a":1}')
+    assert etag.startswith('W/"')
+    bare = etag.removeprefix("W/")
+
+    assert etag_matches(make_request(etag), etag)
+    # Weak comparison - a strong copy of the same tag still matches
+    assert etag_matches(make_request(bare), etag)
+    assert etag_matches(make_request(f'"other", {etag}'), etag)
+    assert etag_matches(make_request(" * "), etag)
+    assert not etag_matches(make_request('"other"'), etag)
+    assert not etag_matches(make_request(None), etag)
+    assert make_etag(b'{"a":2}') != etag
+
+
+@pytest.mark.parametrize("accept, encoding", [("gzip", "gzip"), ("br", "br")])
+def test_large_json_is_compressed(accept, encoding):
+    response = get(make_client(), "/big", accept)
+    assert response.headers["content-encoding"] == encoding
+    assert response.json() == {"text": BIG}
+    assert vary(response) == ["accept-encoding", "origin"]
+
+
+def test_small_and_binary_bodies_are_left_alone():
+    client = make_client()
+    for path in ("/small", "/binary"):
+        response = get(client, path)
+        assert "content-encoding" not in response.headers
+        assert vary(response) == ["accept-encoding", "origin"]
+    assert get(client, "/text").headers["content-encoding"] == "gzip"
+
+
+def test_no_accept_encoding_passes_through():
+    response = get(make_client(), "/big", accept="identity")
+    assert "content-encoding" not in response.headers
+    assert vary(response) == ["origin"]
+
+
+def test_streamed_body_passes_through():
+    response = get(make_client(), "/stream")
+    assert "content-encoding" not in response.headers
+    assert response.content == (BIG * 2).encode()
+
+
+def test_existing_content_encoding_is_kept():
+    response = get(make_client(), "/encoded")
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.content == BIG.encode()
+
+
+def test_vary_merges_with_cors():
+    response = get(make_client(), "/big", Origin="https://clinic.example")
+    assert response.headers["access-control-allow-origin"] == "https://clinic.example"
+    assert vary(response) == ["accept-encoding", "origin"]
+    assert len(response.headers.get_list("vary")) == 1
+
+
+def test_cached_json_response():
+    etag = make_etag(b"{}")
+    fresh = responses.cached_json_response(make_request(None), b"{}", etag, 42)
+    assert fresh.status_code == 200 and fresh.body == b"{}"
+    assert fresh.headers["cache-control"] == "private, max-age=42"
+
+    cached = responses.cached_json_response(make_request(etag), b"{}", etag, 7)
+    assert cached.status_code == 304 and cached.body == b""
+    assert cached.headers["etag"] == etag
+    assert cached.headers["cache-control"] == "private, max-age=7"
+
+
+def test_research_cache_hit_sends_remaining_ttl(run, monkeypatch):
+    from app.models.schemas import ResearchRequest
+    from app.routes import research
+
+    monkeypatch.setattr(research, "_research_cache", research.OrderedDict())
+    key = ("diabetes care", 5, "en")
+    research._research_cache[key] = (research.time.monotonic() + 30.5, b"{}", '"tag"')
+
+    body, etag, max_age = run(research._cached_research(ResearchRequest(query="Diabetes  care")))
+    assert (body, etag) == (b"{}", '"tag"')
+    assert max_age == 30
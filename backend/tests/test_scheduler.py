@@ -0,0 +1,232 @@
+"""
+Tests for the fair upstream scheduler (app/services/scheduler.py)
+"""
+
+import asyncio
+import pytest
+from app.auth import api_principal
+from app.config import parse_tenant_weights, settings
+from app.services.scheduler import (
+    FairScheduler, Overloaded, RequestIdentity, identify_request, set_identity, upstream_scheduler
+)
+
+
+def make_scheduler(capacity=1, max_queue=100, weights=None, max_tenants=1000):
+    return FairScheduler(capacity, max_queue, weights or {}, default_weight=1.0, max_tenants=max_tenants)
+
+
+async def use_slot(scheduler, tenant, priority="standard", hold=0.0, max_wait=None, served=None):
+    set_identity(RequestIdentity(tenant, priority))
+    async with scheduler.slot(max_wait=max_wait):
+        if served is not None:
+            served.append(tenant)
+        await asyncio.sleep(hold)
+
+
+def test_identify_request_with_api_keys(monkeypatch):
+    monkeypatch.setattr(settings, "api_keys", "secret,other")
+    keyed = identify_request("/api/chat", api_key="secret", tenant_id="clinic-a")
+    # Same id as the history owner, and the tenant header can't override it
+    assert keyed == RequestIdentity(api_principal("secret"), "interactive")
+    assert "secret" not in keyed.tenant
+
+    # Unknown keys and made-up tenant ids all share one flow
+    assert identify_request("/api/chat", "guess-1", None).tenant == "anonymous"
+    assert identify_request("/api/chat", "guess-2", "clinic-a").tenant == "anonymous"
+    assert identify_request("/api/chat", None, "clinic-a").tenant == "anonymous"
+
+
+def test_identify_request_with_tenant_header(monkeypatch):
+    monkeypatch.setattr(settings, "api_keys", "")
+    monkeypatch.setattr(upstream_scheduler, "tenant_weights", {"clinic-a": 3.0})
+    assert identify_request("/api/extract-text/", None, " clinic-a ").tenant == "clinic-a"
+    assert identify_request("/api/chat", "any-key", "clinic-a").tenant == "clinic-a"
+    assert identify_request("/api/chat", "any-key", "clinic-b").tenant == "anonymous"
+    assert identify_request("/api/extract-text", None, None) == RequestIdentity("anonymous", "bulk")
+    assert identify_request("/unknown", None, "").priority == "standard"
+
+
+def test_capacity_is_never_exceeded(run):
+    scheduler = make_scheduler(capacity=2)
+    peak = 0
+
+    async def call():
+        nonlocal peak
+        set_identity(RequestIdentity("t", "standard"))
+        async with scheduler.slot():
+            peak = max(peak, scheduler.in_flight)
+            await asyncio.sleep(0.01)
+
+    async def scenario():
+        await asyncio.gather(*(call() for _ in range(10)))
+
+    run(scenario())
+    assert peak == 2
+    assert scheduler.in_flight == 0
+    assert scheduler.tenants["t"].admitted == 10
+
+
+def test_heavier_tenant_gets_more_slots(run):
+    scheduler = make_scheduler(capacity=1, weights={"big": 3.0, "small": 1.0})
+    served = []
+
+    async def scenario():
+        # Hold the only slot so everyone else has to queue
+        blocker = asyncio.create_task(use_slot(scheduler, "blocker", hold=0.05))
+        await asyncio.sleep(0.01)
+        waiters = []
+        for _ in range(8):
+            waiters.append(asyncio.create_task(use_slot(scheduler, "big", served=served)))
+            waiters.append(asyncio.create_task(use_slot(scheduler, "small", served=served)))
+        await asyncio.gather(blocker, *waiters)
+
+    run(scenario())
+    first_half = served[:8]
+    assert first_half.count("big") >= 5
+    assert len(served) == 16
+
+
+def test_interactive_priority_goes_first(run):
+    scheduler = make_scheduler(capacity=1)
+    served = []
+
+    async def scenario():
+        blocker = asyncio.create_task(use_slot(scheduler, "blocker", hold=0.05))
+        await asyncio.sleep(0.01)
+        bulk = [asyncio.create_task(use_slot(scheduler, "t", "bulk", served=served)) for _ in range(3)]
+        await asyncio.sleep(0)
+        chat = asyncio.create_task(use_slot(scheduler, "t-chat", "interactive", served=served))
+        await asyncio.gather(blocker, chat, *bulk)
+
+    run(scenario())
+    assert served.index("t-chat") == 0
+
+
+def test_full_queue_is_shed(run):
+    scheduler = make_scheduler(capacity=1, max_queue=1)
+
+    async def scenario():
+        blocker = asyncio.create_task(use_slot(scheduler, "a", hold=0.05))
+        await asyncio.sleep(0.01)
+        queued = asyncio.create_task(use_slot(scheduler, "b"))
+        await asyncio.sleep(0.01)
+        with pytest.raises(Overloaded) as error:
+            await use_slot(scheduler, "c")
+        await asyncio.gather(blocker, queued)
+        return error.value
+
+    error = run(scenario())
+    assert error.retry_after >= 1
+    assert scheduler.tenants["c"].shed == 1
+    assert scheduler.in_flight == 0
+
+
+def test_expected_wait_past_deadline_is_shed_up_front(run):
+    scheduler = make_scheduler(capacity=1)
+
+    async def scenario():
+        blocker = asyncio.create_task(use_slot(scheduler, "a", hold=0.05))
+        await asyncio.sleep(0.01)
+        # Default service time estimate is 1s, far over the 10ms we can afford
+        with pytest.raises(Overloaded):
+            await use_slot(scheduler, "b", max_wait=0.01)
+        await blocker
+
+    run(scenario())
+    assert scheduler.tenants["b"].queued == 0
+
+
+def test_queue_wait_never_outlasts_max_wait(run):
+    scheduler = make_scheduler(capacity=1)
+    scheduler.service_time = {priority: 0.001 for priority in scheduler.service_time}
+
+    async def scenario():
+        blocker = asyncio.create_task(use_slot(scheduler, "a", hold=0.3))
+        await asyncio.sleep(0.01)
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        with pytest.raises(Overloaded):
+            await use_slot(scheduler, "b", max_wait=0.05)
+        waited = loop.time() - start
+        await blocker
+        return waited
+
+    assert run(scenario()) < 0.2
+    assert scheduler.tenants["b"].queued == 0
+    assert scheduler.in_flight == 0
+
+
+def test_cancelled_waiter_does_not_leak_a_slot(run):
+    scheduler = make_scheduler(capacity=1)
+
+    async def scenario():
+        blocker = asyncio.create_task(use_slot(scheduler, "a", hold=0.05))
+        await asyncio.sleep(0.01)
+        waiter = asyncio.create_task(use_slot(scheduler, "b"))
+        await asyncio.sleep(0.01)
+        waiter.cancel()
+        await blocker
+        # The slot must still be usable
+        await asyncio.wait_for(use_slot(scheduler, "c"), 1)
+
+    run(scenario())
+    assert scheduler.in_flight == 0
+
+
+def test_try_acquire_only_takes_free_slots():
+    scheduler = make_scheduler(capacity=1)
+    assert scheduler.try_acquire() is True
+    assert scheduler.try_acquire() is False
+    scheduler.release()
+    assert scheduler.in_flight == 0
+
+
+def test_idle_tenants_are_forgotten(run):
+    scheduler = make_scheduler(capacity=4, max_tenants=3)
+
+    async def scenario():
+        for i in range(20):
+            await use_slot(scheduler, f"tenant-{i}")
+
+    run(scenario())
+    assert list(scheduler.tenants) == ["tenant-17", "tenant-18", "tenant-19"]
+
+
+def test_busy_tenants_overflow_into_anonymous(run):
+    scheduler = make_scheduler(capacity=10, max_tenants=2)
+
+    async def scenario():
+        busy = [asyncio.create_task(use_slot(scheduler, name, hold=0.05)) for name in ("a", "b")]
+        await asyncio.sleep(0.01)
+        await use_slot(scheduler, "c")
+        await asyncio.gather(*busy)
+
+    run(scenario())
+    assert "c" not in scheduler.tenants
+    assert scheduler.tenants["anonymous"].admitted == 1
+
+
+def test_flow_table_stays_bounded(run):
+    scheduler = make_scheduler(capacity=1, max_tenants=5)
+
+    async def call(tenant):
+        await use_slot(scheduler, tenant, hold=0.001)
+
+    async def scenario():
+        for round_number in range(30):
+            await asyncio.gather(*(call(f"t{round_number}-{i}") for i in range(4)))
+
+    run(scenario())
+    assert len(scheduler.tenants) <= 5
+    assert len(scheduler._flow_finish) <= len(scheduler.tenants) * 3
+
+
+def test_parse_tenant_weights():
+    assert parse_tenant_weights("") == {}
+    assert parse_tenant_weights("a=2, b=0.5,") == {"a": 2.0, "b": 0.5}
+
+
+@pytest.mark.parametrize("text", ["a=0", "a=-1", "a=abc", "a", "=2", "a=inf", "a=nan"])
+def test_parse_tenant_weights_rejects_bad_values(text):
+    with pytest.raises(ValueError):
+        parse_tenant_weights(text)
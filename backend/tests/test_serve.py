@@ -0,0 +1,123 @@
+"""
+Tests for the production server helpers (app/serve.py)
+"""
+
+import os
+import signal
+import socket
+import time
+import pytest
+from pydantic import ValidationError
+from app import serve
+from app.config import Settings, settings
+from app.chains import analysis_chain, chat_chain
+from app.services.gemini_service import gemini_service
+from app.services.tavily_service import tavily_service
+from benchmarks.fakes import FakeChatGoogleGenerativeAI
+
+
+def test_worker_reset_keeps_preloaded_prompts(monkeypatch):
+    # A new fake client every time a chain loads one, like after a real fork
+    monkeypatch.setattr(chat_chain, "load_google_llm", FakeChatGoogleGenerativeAI)
+    monkeypatch.setattr(analysis_chain, "load_google_llm", FakeChatGoogleGenerativeAI)
+    monkeypatch.setattr(gemini_service, "vision_llm", gemini_service.vision_llm)
+    monkeypatch.setattr(tavily_service, "client", tavily_service.client)
+    try:
+        serve.preload()
+        chat = chat_chain.create_chat_chain("en")
+        prompt, parser = analysis_chain.create_analysis_prompt("fr")
+
+        serve.reset_upstream_clients()
+
+        # New LLM client, same prompts and parsers
+        new_chat = chat_chain.create_chat_chain("en")
+        assert new_chat.middle[0] is not chat.middle[0]
+        assert new_chat.first is chat_chain.create_chat_prompt("en") is chat.first
+        analysis = analysis_chain.create_analysis_chain("fr")
+        assert analysis.first is prompt and analysis.last is parser
+    finally:
+        chat_chain.create_chat_chain.cache_clear()
+        analysis_chain.create_analysis_chain.cache_clear()
+
+
+class FakeConfig:
+    loop = "asyncio"
+    http = "h11"
+
+    def bind_socket(self):
+        return socket.socket()
+
+
+class CrashingSupervisor(serve.Supervisor):
+    """Workers die straight away, like a worker whose startup raises"""
+
+    def spawn(self, number):
+        pid = os.fork()
+        if pid == 0:
+            os._exit(1)
+        self.workers[pid] = number
+        self.started[number] = time.monotonic()
+        self.spawned = getattr(self, "spawned", 0) + 1
+
+
+def test_recycled_worker_is_replaced_at_once():
+    supervisor = serve.Supervisor(FakeConfig())
+    supervisor.started[0] = time.monotonic()
+    supervisor.failures[0] = 3
+
+    supervisor.schedule_respawn(0, 0)
+    assert supervisor.failures[0] == 0
+    assert supervisor.respawn_at[0] <= time.monotonic()
+
+    # A crash after serving for a while is not a startup failure either
+    supervisor.started[0] = time.monotonic() - serve.STARTUP_WINDOW
+    supervisor.schedule_respawn(0, 1)
+    assert supervisor.failures[0] == 0
+    supervisor.socket.close()
+
+
+def test_startup_crashes_back_off():
+    supervisor = serve.Supervisor(FakeConfig())
+    delays = []
+    for _ in range(serve.MAX_STARTUP_FAILURES - 1):
+        supervisor.started[0] = time.monotonic()
+        supervisor.schedule_respawn(0, 1)
+        delays.append(supervisor.respawn_at[0] - time.monotonic())
+    assert delays == sorted(delays) and delays[-1] > 3 * delays[0]
+    assert not supervisor.stopping
+    supervisor.socket.close()
+
+
+def test_supervisor_gives_up_on_startup_crash_loop(monkeypatch):
+    monkeypatch.setattr(serve, "STARTUP_BACKOFF", 0.01)
+    monkeypatch.setattr(settings, "workers", 2)
+    handlers = {sig: signal.getsignal(sig) for sig in (signal.SIGTERM, signal.SIGINT)}
+    supervisor = CrashingSupervisor(FakeConfig())
+    try:
+        assert supervisor.run() == 1
+    finally:
+        for sig, handler in handlers.items():
+            signal.signal(sig, handler)
+
+    assert supervisor.spawned <= 2 * serve.MAX_STARTUP_FAILURES
+    assert not supervisor.workers
+
+
+def test_server_settings_are_checked(monkeypatch):
+    with pytest.raises(ValidationError):
+        Settings(event_loop="uv-loop")
+    with pytest.raises(ValidationError):
+        Settings(http_parser="http")
+
+    # Asking for a library that isn't installed fails before any worker starts
+    monkeypatch.setattr(serve.importlib.util, "find_spec", lambda name: None)
+    monkeypatch.setattr(settings, "event_loop", "uvloop")
+    monkeypatch.setattr(settings, "http_parser", "httptools")
+    with pytest.raises(SystemExit, match="uvloop"):
+        serve.resolve_event_loop()
+    with pytest.raises(SystemExit, match="httptools"):
+        serve.resolve_http_parser()
+
+    monkeypatch.setattr(settings, "event_loop", "auto")
+    monkeypatch.setattr(settings, "http_parser", "auto")
+    assert (serve.resolve_event_loop(), serve.resolve_http_parser()) == ("asyncio", "h11")